@@ -0,0 +1,320 @@
+"""
+Offline load test for the backend.
+
+Starts fake_upstreams.py and the FastAPI app (uvicorn) as subprocesses, points the app's
+OpenAI / Gemini / Supabase / GNews / RSS endpoints at the fakes, then drives each scenario
+at a fixed concurrency and reports throughput and latency percentiles as JSON.
+
+Usage:
+  python benchmark.py --concurrency 16 --requests 200 --output bench.json
+  python benchmark.py --scenarios chat_ask,rag_search --latency openai=800 --error-rate openai=0.1
+  python benchmark.py --compare bench.json --max-regression 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from fake_upstreams import add_fault_arguments
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = [
+    "How do I prepare for a backend engineering interview?",
+    "Which projects show system design skills?",
+    "What should I learn after Python basics?",
+    "How important is DSA for internships?",
+    "How do I build a portfolio for data science roles?",
+    "What are the latest trends in AI engineering?",
+    "How much SQL does a full stack developer need?",
+    "How do I stay consistent while learning?",
+]
+TOPICS = ["technology", "ai", "startups", "science", "business"]
+
+
+def profile_payload(i: int) -> dict:
+    return {
+        "personalContext": {"name": "Bench User", "educationLevel": "UNDERGRAD"},
+        "careerTarget": {"desiredRole": ["Backend Engineer", "Data Scientist", "ML Engineer"][i % 3]},
+        "timeConsistency": {"hoursPerWeek": 10 + i % 4},
+        "skillInventory": {"programmingFundamentals": 3, "dsa": 2, "development": 3},
+        "practiceOutput": {"projects": i % 5},
+        "learningSources": {"primary": "courses"},
+    }
+
+
+# name -> (method, path, request builder taking the request index)
+SCENARIOS: Dict[str, tuple] = {
+    "health": ("GET", "/health", lambda i: {}),
+    "news": ("GET", "/news/", lambda i: {"params": {"topic": TOPICS[i % len(TOPICS)]}}),
+    "news_rss": ("GET", "/news/rss", lambda i: {}),
+    "rag_search": ("GET", "/rag/search", lambda i: {"params": {"query": QUERIES[i % len(QUERIES)]}}),
+    "chat_ask": ("POST", "/chat/ask", lambda i: {"json": {"query": QUERIES[i % len(QUERIES)]}}),
+    "chat_ask_uncached": ("POST", "/chat/ask", lambda i: {"json": {"query": f"{QUERIES[i % len(QUERIES)]} (variant {i})"}}),
+    "chat_stream": ("POST", "/chat/ask/stream", lambda i: {"json": {"query": f"{QUERIES[i % len(QUERIES)]} (stream {i})"}}),
+    "assessment": ("POST", "/assessment/analyze", lambda i: {"json": profile_payload(i)}),
+    "opportunities": ("POST", "/opportunities/fetch", lambda i: {"json": {"profile": profile_payload(i)}}),
+    "rag_ingest_batch": ("POST", "/rag/ingest/batch", lambda i: {"json": {"source": "bench", "documents": [
+        {"content": f"Benchmark document {i}-{j}: notes on career skill {j}."} for j in range(8)
+    ]}}),
+}
+DEFAULT_SCENARIOS = ["health", "news", "news_rss", "rag_search", "chat_ask", "chat_ask_uncached", "chat_stream", "assessment", "opportunities"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[rank], 2)
+
+
+def summarize(latencies_ms: List[float], statuses: Dict[str, int], errors: int, wall_seconds: float,
+              ttfb_ms: Optional[List[float]] = None) -> Dict:
+    ordered = sorted(latencies_ms)
+    total = len(latencies_ms)
+    result = {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": {
+            "mean": round(sum(ordered) / total, 2) if total else None,
+            "p50": percentile(ordered, 50),
+            "p95": percentile(ordered, 95),
+            "p99": percentile(ordered, 99),
+            "max": round(ordered[-1], 2) if ordered else None,
+        },
+        "status_codes": statuses,
+    }
+    if ttfb_ms:
+        ordered_ttfb = sorted(ttfb_ms)
+        result["ttfb_ms"] = {p: percentile(ordered_ttfb, v) for p, v in (("p50", 50), ("p95", 95), ("p99", 99))}
+    return result
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests: int, concurrency: int, warmup: int) -> Dict:
+    method, path, build = SCENARIOS[name]
+    latencies, ttfbs = [], []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    counter = iter(range(warmup + requests))
+
+    async def one(i: int, record: bool):
+        nonlocal errors
+        started = time.perf_counter()
+        status, ttfb = "exception", None
+        try:
+            async with client.stream(method, path, **build(i)) as response:
+                async for _ in response.aiter_raw():
+                    if ttfb is None:
+                        ttfb = (time.perf_counter() - started) * 1000
+                status = str(response.status_code)
+                failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        if not record:
+            return
+        latencies.append((time.perf_counter() - started) * 1000)
+        if ttfb is not None and name == "chat_stream":
+            ttfbs.append(ttfb)
+        statuses[status] = statuses.get(status, 0) + 1
+        errors += failed
+
+    async def worker():
+        for i in counter:
+            await one(i, record=i >= warmup)
+
+    # Warmup runs serially so first-use costs (client construction, cold caches) stay out of the numbers
+    for _ in range(warmup):
+        await one(next(counter), record=False)
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, statuses, errors, time.perf_counter() - started, ttfbs)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def fault_argv(args) -> List[str]:
+    argv = []
+    for flag, values in (("--latency", args.latency), ("--jitter", args.jitter), ("--error-rate", args.error_rate)):
+        for value in values or []:
+            argv += [flag, value]
+    argv += ["--error-status", str(args.error_status), "--seed-documents", str(args.seed_documents)]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    return argv
+
+
+def app_environment(fake_url: str, extra: List[str]) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.bench",
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_BASE_URL": fake_url,
+        "GNEWS_API_KEY": "bench",
+        "GNEWS_BASE_URL": fake_url,
+        "RSS_DEFAULT_FEEDS": "false",
+        "RSS_FEEDS": ",".join(f"{fake_url}/rss/{n}.xml" for n in range(3)),
+        # Keep runs independent of each other and of a developer's local cache
+        "EMBEDDING_CACHE_PATH": "",
+        "REQUEST_LOG_SAMPLE_RATE": "0",
+    }
+    for pair in extra or []:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+async def wait_until_ready(url: str, timeout: float, process: subprocess.Popen):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def start_process(argv: List[str], env: Optional[Dict[str, str]] = None, quiet: bool = True) -> subprocess.Popen:
+    output = subprocess.DEVNULL if quiet else None
+    return subprocess.Popen([sys.executable] + argv, cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+
+
+async def benchmark(args) -> Dict:
+    fake_port, app_port = free_port(), free_port()
+    fake_url, app_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{app_port}"
+
+    processes = []
+    try:
+        fakes = start_process(["fake_upstreams.py", "--port", str(fake_port)] + fault_argv(args), quiet=not args.verbose)
+        processes.append(fakes)
+        await wait_until_ready(f"{fake_url}/_bench/stats", 30, fakes)
+
+        app = start_process(
+            ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"],
+            env=app_environment(fake_url, args.env), quiet=not args.verbose
+        )
+        processes.append(app)
+        await wait_until_ready(f"{app_url}/health/ready", 60, app)
+
+        results = {}
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+            for name in args.scenarios:
+                print(f"Running {name} ({args.requests} requests, concurrency {args.concurrency})...", file=sys.stderr)
+                results[name] = await run_scenario(client, name, args.requests, args.concurrency, args.warmup)
+            upstream_stats = (await client.get(f"{fake_url}/_bench/stats")).json()
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "warmup": args.warmup,
+            "faults": fault_argv(args),
+            "env": args.env or [],
+        },
+        "scenarios": results,
+        "upstreams": upstream_stats,
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Scenarios whose p95 latency or throughput regressed by more than max_regression (a fraction)"""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        p95, p95_before = result["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        if p95 and p95_before and p95 > p95_before * (1 + max_regression):
+            regressions.append(f"{name}: p95 {p95_before}ms -> {p95}ms")
+        rps, rps_before = result["throughput_rps"], before["throughput_rps"]
+        if rps and rps_before and rps < rps_before * (1 - max_regression):
+            regressions.append(f"{name}: throughput {rps_before} -> {rps} req/s")
+    return regressions
+
+
+def print_table(report: Dict):
+    print(f"{'scenario':<20}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}", file=sys.stderr)
+    for name, r in report["scenarios"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<20}{r['throughput_rps']:>9}{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}{r['errors']:>8}", file=sys.stderr)
+
+
+def parse_scenarios(value: str) -> List[str]:
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenario(s): {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the backend against local fake upstreams")
+    parser.add_argument("--scenarios", type=parse_scenarios, default=DEFAULT_SCENARIOS,
+                        help=f"Comma-separated list (available: {', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--env", action="append", metavar="KEY=VALUE", help="Extra environment for the app (repeatable)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report; exit non-zero on regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed fractional p95/throughput regression")
+    parser.add_argument("--verbose", action="store_true", help="Show app and fake upstream output")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args))
+    print_table(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
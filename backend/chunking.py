@@ -0,0 +1,91 @@
+import hashlib
+import re
+from typing import List, Tuple
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token for English text (close enough for budgeting, no tokenizer needed)"""
+    return max(1, len(text) // 4)
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with whitespace normalized, so reflowed but unchanged chunks still match"""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def _units(text: str, max_tokens: int, window_tokens: int) -> List[Tuple[str, int, str]]:
+    """
+    Split text into (piece, tokens, separator) units: sentences, with over-long sentences cut
+    into word windows of about window_tokens. Words longer than a window (URLs, base64, text
+    without spaces) are cut by characters. The separator is what joins the piece to the one
+    before it, so paragraph breaks survive re-joining.
+    """
+    piece_chars = window_tokens * 4
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        sep = "\n\n"
+        for sentence in SENTENCE_END.split(paragraph.strip()):
+            if not sentence:
+                continue
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append((sentence, estimate_tokens(sentence), sep))
+                sep = " "
+                continue
+            window, window_chars = [], 0
+            words = [
+                word[start:start + piece_chars]
+                for word in sentence.split()
+                for start in range(0, len(word), piece_chars)
+            ]
+            for word in words:
+                if window and (window_chars + len(word)) // 4 > window_tokens:
+                    piece = " ".join(window)
+                    units.append((piece, estimate_tokens(piece), sep))
+                    sep = " "
+                    window, window_chars = [], 0
+                window.append(word)
+                window_chars += len(word) + 1
+            if window:
+                piece = " ".join(window)
+                units.append((piece, estimate_tokens(piece), sep))
+                sep = " "
+    return units
+
+
+def _join(units: List[Tuple[str, int, str]]) -> str:
+    return "".join(piece if i == 0 else sep + piece for i, (piece, _, sep) in enumerate(units))
+
+
+def chunk_text(text: str, max_tokens: int = 400, overlap_tokens: int = 60) -> List[str]:
+    """
+    Split text into chunks of at most ~max_tokens, preferring paragraph and sentence boundaries.
+    Each chunk repeats up to overlap_tokens of trailing text from the previous one so facts that
+    straddle a boundary stay retrievable. Text that fits in one chunk is returned unchanged.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text.strip()] if text.strip() else []
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    # Over-long sentences are cut into windows small enough to be carried as overlap
+    window_tokens = min(max_tokens, max(16, overlap_tokens or max_tokens))
+
+    # Sizes are tracked in characters of the joined text, so the estimate of every chunk is exact
+    chunks, current, current_chars = [], [], 0
+    for unit in _units(text, max_tokens, window_tokens):
+        if current and (current_chars + len(unit[2]) + len(unit[0])) // 4 > max_tokens:
+            chunks.append(_join(current))
+            carried, carried_chars = [], 0
+            for previous in reversed(current):
+                if (carried_chars + len(previous[0])) // 4 > overlap_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_chars += len(previous[0]) + len(previous[2])
+            if (carried_chars + len(unit[2]) + len(unit[0])) // 4 > max_tokens:
+                carried, carried_chars = [], 0
+            current, current_chars = carried, carried_chars
+        current.append(unit)
+        current_chars += len(unit[0]) + len(unit[2])
+    if current:
+        chunks.append(_join(current))
+    return chunks
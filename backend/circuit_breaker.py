@@ -0,0 +1,147 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+# PostgREST error codes that describe the request rather than the database's health:
+# PGRST1xx-3xx (bad request, schema, auth; PGRST0xx are connection errors) and the SQLSTATE
+# classes 22 (data exception), 23 (constraint violation) and 42 (syntax or access rule)
+CLIENT_SQLSTATE_CLASSES = ("22", "23", "42")
+
+
+def default_is_failure(exc: BaseException) -> bool:
+    """Client errors (4xx other than 408/429, PostgREST request errors) mean a bad request, not an unhealthy upstream"""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    if isinstance(status, str):
+        if status.startswith("PGRST"):
+            return status.startswith("PGRST0")
+        if len(status) == 5 and status[:2] in CLIENT_SQLSTATE_CLASSES:
+            return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed -> open after failure_threshold failures in a row; open -> half_open once
+    recovery_timeout has passed, letting half_open_max_calls trial calls through;
+    a trial success closes the circuit, a trial failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30,
+                 half_open_max_calls: int = 1, is_failure: Callable[[BaseException], bool] = default_is_failure):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._trial_calls = 0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            if state == OPEN:
+                self.opened_at = time.monotonic()
+                self.stats["opened"] += 1
+                print(f"Circuit {self.name} opened: {self.last_error}")
+            elif state == CLOSED:
+                print(f"Circuit {self.name} closed")
+
+    def _retry_in(self) -> float:
+        if self.state != OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (does not reserve a trial slot)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._retry_in() == 0
+        return self._trial_calls < self.half_open_max_calls
+
+    def acquire(self) -> bool:
+        if self.state == OPEN and self._retry_in() == 0:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial_calls >= self.half_open_max_calls:
+                return False
+            self._trial_calls += 1
+            return True
+        return self.state == CLOSED
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        # A call that started before the circuit opened is not a trial and cannot close it
+        if self.state == OPEN:
+            return
+        if self.state == HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+        self._set_state(CLOSED)
+
+    def record_failure(self, error: Optional[str] = None):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+            self._set_state(OPEN)
+            # Restart the recovery clock on a failed trial
+            self.opened_at = time.monotonic()
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._set_state(OPEN)
+
+    def _release(self):
+        if self.state == HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+
+    @contextmanager
+    def guard(self):
+        """Wrap one upstream call; raises CircuitOpenError without calling when the circuit is open"""
+        if not self.acquire():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(self.name, self._retry_in())
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure(str(e) or type(e).__name__)
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled calls say nothing about upstream health
+            self._release()
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self._retry_in(), 1) if self.state == OPEN else None,
+            "last_error": self.last_error,
+            **self.stats,
+        }
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from quantization import check_storage, decode_vector, encode_vector
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache:
+    1. Bounded in-memory LRU
+    2. Persistent SQLite table of vector blobs (survives restarts)
+    Both tiers hold encoded vectors: storage="float16" halves them, "int8" quarters them;
+    lookups always return float lists.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None, storage: str = "float32"):
+        self.max_entries = max_entries
+        self.path = path
+        self.storage = check_storage(storage)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("pragma journal_mode=wal")
+                self._db.execute("pragma synchronous=normal")
+                self._db.execute(
+                    "create table if not exists embeddings ("
+                    "key text primary key, model text not null, vector blob not null)"
+                )
+                columns = [row[1] for row in self._db.execute("pragma table_info(embeddings)")]
+                if "storage" not in columns:
+                    # Blobs written before compact storage existed are float32
+                    self._db.execute("alter table embeddings add column storage text not null default 'float32'")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Embedding cache disk tier disabled: {e}")
+                self._db = None
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = cache_key(model, text)
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return decode_vector(blob, self.storage).tolist()
+
+            if self._db is not None:
+                row = self._db.execute("select vector, storage from embeddings where key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = decode_vector(row[0], row[1])
+                    self._remember(key, encode_vector(vector, self.storage))
+                    self.stats["disk_hits"] += 1
+                    return vector.tolist()
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, model: str, text: str, vector: List[float]):
+        key = cache_key(model, text)
+        blob = encode_vector(vector, self.storage)
+        with self._lock:
+            self._remember(key, blob)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "insert or replace into embeddings (key, model, vector, storage) values (?, ?, ?, ?)",
+                        (key, model, blob, self.storage)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Embedding cache write error: {e}")
+            self.stats["writes"] += 1
+
+    def _remember(self, key: str, blob: bytes):
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("select count(*) from embeddings").fetchone()[0]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "storage": self.storage,
+                "memory_entries": len(self._memory),
+                "memory_mb": round(sum(len(blob) for blob in self._memory.values()) / (1024 * 1024), 2),
+                "memory_capacity": self.max_entries,
+                "disk_entries": disk_entries,
+            }
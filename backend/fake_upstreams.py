@@ -0,0 +1,473 @@
+"""
+Local stand-ins for the backend's upstream services, used by benchmark.py.
+
+One FastAPI app serves:
+  /v1/...                 OpenAI (chat completions incl. streaming and tool calls, embeddings, models)
+  /v1beta/models/...      Gemini (generateContent, streamGenerateContent, models.get)
+  /rest/v1/...            Supabase PostgREST (tables + match_knowledge RPC), in memory
+  /api/v4/..., HEAD /     GNews
+  /rss/{n}.xml            RSS feeds (with ETag / 304 support)
+
+Every upstream gets an injected latency (base + uniform jitter, milliseconds) and an error rate.
+
+Usage:
+  python fake_upstreams.py --port 9100 --latency openai=400 --jitter openai=200 --error-rate gemini=0.05
+"""
+import argparse
+import asyncio
+import base64
+import csv
+import hashlib
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+UPSTREAMS = ["openai", "gemini", "supabase", "gnews", "rss"]
+
+# Milliseconds; roughly the medians seen against the real services
+DEFAULT_LATENCY_MS = {"openai": 600, "gemini": 500, "supabase": 40, "gnews": 250, "rss": 150}
+DEFAULT_JITTER_MS = {"openai": 300, "gemini": 250, "supabase": 20, "gnews": 100, "rss": 80}
+# Per streamed token, after the first-token latency above
+STREAM_TOKEN_MS = 15
+
+EMBEDDING_DIM = 1536
+ANSWER_WORDS = (
+    "Focus on fundamentals first then build two portfolio projects that show system design depth "
+    "and practice explaining trade-offs out loud before interviews"
+).split()
+
+
+class Faults:
+    def __init__(self, latency: Dict[str, float], jitter: Dict[str, float], error_rate: Dict[str, float],
+                 error_status: int = 500, seed: Optional[int] = None):
+        self.latency = {**DEFAULT_LATENCY_MS, **latency}
+        self.jitter = {**DEFAULT_JITTER_MS, **jitter}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.calls = {name: 0 for name in UPSTREAMS}
+        self.errors = {name: 0 for name in UPSTREAMS}
+
+    async def delay(self, upstream: str):
+        self.calls[upstream] += 1
+        millis = self.latency.get(upstream, 0) + self.random.uniform(0, self.jitter.get(upstream, 0))
+        await asyncio.sleep(millis / 1000)
+
+    def fail(self, upstream: str) -> Optional[Response]:
+        if self.random.random() < self.error_rate.get(upstream, 0):
+            self.errors[upstream] += 1
+            headers = {"Retry-After": "1"} if self.error_status == 429 else None
+            return JSONResponse(status_code=self.error_status, content={"error": {"message": f"injected {upstream} failure"}},
+                                headers=headers)
+        return None
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic unit vector per text, so identical queries retrieve identical neighbours"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def answer_text(prompt: str, words: int = 40) -> str:
+    rng = random.Random(prompt)
+    return " ".join(rng.choice(ANSWER_WORDS) for _ in range(words)) + "."
+
+
+def last_user_text(messages: List[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+def json_answer(prompt: str) -> str:
+    """Structured replies for response_format=json_object (assessment and opportunities prompts)"""
+    if "opportunit" in prompt.lower():
+        return json.dumps([{
+            "id": f"opp-{i}", "title": f"Engineering Internship {i}", "company": "Example Corp",
+            "type": "INTERNSHIP", "deadline": "2026-12-31", "url": "https://example.com/jobs",
+            "relevanceReason": "Matches the target role", "requirements": ["DSA"], "location": "Remote",
+            "stipend": "$5,000/month", "matchScore": 80 - i
+        } for i in range(5)])
+    return json.dumps({
+        "identified_gaps": [{"title": "System Design", "severity": "MODERATE", "quantification": "2/5", "impact": "Limits senior roles"}],
+        "next_priority_actions": [{"order": 1, "action": "Build a project", "impact": "HIGH", "timeline": "4 weeks"}],
+        "learning_roadmap": [],
+        "career_risk_assessment": "Moderate",
+        "level": "INTERMEDIATE",
+        "skillDepthScore": 0.6,
+        "consistencyScore": 0.7,
+        "practicalReadinessScore": 0.5,
+        "market_intel": {"salary_range": "$80k-$120k", "demand_level": "HIGH", "top_3_trending_skills": ["AI"], "market_sentiment": "Positive"}
+    })
+
+
+def rss_document(feed: int, items: int = 20) -> str:
+    entries = "".join(
+        f"<item><title>Feed {feed} story {i}</title><link>https://example.com/{feed}/{i}</link>"
+        f"<description>&lt;p&gt;Summary of story {i} from feed {feed}.&lt;/p&gt;</description>"
+        f"<pubDate>Mon, 05 Oct 2026 10:{i:02d}:00 GMT</pubDate></item>"
+        for i in range(items)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench feed {feed}</title>{entries}</channel></rss>'
+
+
+class KnowledgeStore:
+    """In-memory knowledge_base / user_data tables with a numpy-backed match_knowledge"""
+
+    def __init__(self, seed_documents: int = 0):
+        self.tables: Dict[str, List[dict]] = {"knowledge_base": [], "user_data": []}
+        self.next_id = 1
+        self._matrix = None
+        for i in range(seed_documents):
+            content = f"Career guide section {i}: skills, projects and interview preparation for role family {i % 12}."
+            self.insert("knowledge_base", [{"content": content, "source": "bench_seed", "embedding": fake_embedding(content)}])
+
+    def insert(self, table: str, rows: List[dict], upsert_on: Optional[str] = None) -> List[dict]:
+        self._matrix = None
+        stored = self.tables.setdefault(table, [])
+        out = []
+        for row in rows:
+            row = dict(row)
+            if upsert_on and row.get(upsert_on) is not None:
+                existing = next((r for r in stored if r.get(upsert_on) == row[upsert_on]), None)
+                if existing is not None:
+                    existing.update(row)
+                    out.append(existing)
+                    continue
+            if table == "knowledge_base":
+                row.setdefault("id", self.next_id)
+                self.next_id += 1
+                if isinstance(row.get("embedding"), str):
+                    row["embedding"] = json.loads(row["embedding"])
+            stored.append(row)
+            out.append(row)
+        return out
+
+    def match(self, query_embedding, match_count: int = 5, filter_source: Optional[str] = None,
+              min_similarity: Optional[float] = None, include_embedding: bool = False, **_) -> List[dict]:
+        if self._matrix is None:
+            rows = [r for r in self.tables["knowledge_base"] if r.get("embedding")]
+            matrix = np.asarray([r["embedding"] for r in rows], dtype=np.float32).reshape(len(rows), -1)
+            self._matrix = (rows, matrix)
+        rows, matrix = self._matrix
+        if not rows:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0))
+        if filter_source is not None:
+            scores = np.where([r.get("source") == filter_source for r in rows], scores, -np.inf)
+        top = [i for i in np.argsort(-scores)[:match_count] if scores[i] > -np.inf]
+        if min_similarity is not None:
+            top = [i for i in top if scores[i] >= min_similarity]
+        return [{"id": rows[i]["id"], "content": rows[i]["content"], "source": rows[i].get("source"),
+                 "similarity": float(scores[i]),
+                 # PostgREST returns pgvector columns as text
+                 "embedding": json.dumps(rows[i]["embedding"]) if include_embedding else None} for i in top]
+
+
+def parse_filters(params) -> List[tuple]:
+    filters = []
+    for column, value in params.multi_items():
+        if column in ("select", "limit", "offset", "order", "on_conflict", "columns"):
+            continue
+        op, _, operand = value.partition(".")
+        filters.append((column, op, operand))
+    return filters
+
+
+def compare_key(value):
+    # Fake ids are integers; compare them numerically
+    text = str(value)
+    return (0, int(text), "") if text.lstrip("-").isdigit() else (1, 0, text)
+
+
+def row_matches(row: dict, filters: List[tuple]) -> bool:
+    for column, op, operand in filters:
+        value = str(row.get(column))
+        if op == "eq" and value != operand:
+            return False
+        if op == "gt" and not compare_key(row.get(column)) > compare_key(operand):
+            return False
+        if op == "is" and operand == "null" and row.get(column) is not None:
+            return False
+        if op == "in" and value not in next(csv.reader([operand[1:-1]])):
+            return False
+    return True
+
+
+def project(row: dict, select: str) -> dict:
+    if not select or select == "*":
+        out = dict(row)
+    else:
+        out = {column.strip(): row.get(column.strip()) for column in select.split(",")}
+    # PostgREST returns pgvector columns as text
+    if isinstance(out.get("embedding"), list):
+        out["embedding"] = json.dumps(out["embedding"])
+    return out
+
+
+def create_app(faults: Faults, store: KnowledgeStore) -> FastAPI:
+    app = FastAPI(title="EduAI fake upstreams")
+
+    # ============= OPENAI =============
+
+    @app.get("/v1/models/{model}")
+    async def openai_model(model: str):
+        await faults.delay("openai")
+        return faults.fail("openai") or {"id": model, "object": "model", "created": 0, "owned_by": "bench"}
+
+    @app.post("/v1/embeddings")
+    async def openai_embeddings(payload: dict):
+        await faults.delay("openai")
+        failure = faults.fail("openai")
+        if failure:
+            return failure
+        inputs = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+        dim = payload.get("dimensions") or EMBEDDING_DIM
+        data = []
+        for i, text in enumerate(inputs):
+            vec = fake_embedding(text, dim)
+            if payload.get("encoding_format") == "base64":
+                vec = base64.b64encode(np.asarray(vec, dtype=np.float32).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        tokens = sum(max(1, len(t) // 4) for t in inputs)
+        return {"object": "list", "model": payload["model"], "data": data,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(payload: dict):
+        await faults.delay("openai")
+        failure = faults.fail("openai")
+        if failure:
+            return failure
+
+        messages = payload["messages"]
+        prompt = last_user_text(messages)
+        tool_names = [t["function"]["name"] for t in payload.get("tools") or []]
+        # The agent asks for the knowledge base on its first turn, then answers from the tool output
+        wants_tool = tool_names and messages[-1].get("role") == "user"
+        usage = {"prompt_tokens": sum(len(json.dumps(m)) for m in messages) // 4, "completion_tokens": 60, "total_tokens": 0}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": payload["model"]}
+
+        tool_call = None
+        if wants_tool:
+            name = "search_knowledge_base" if "search_knowledge_base" in tool_names else tool_names[0]
+            tool_call = {"id": f"call_{hashlib.md5(prompt.encode()).hexdigest()[:12]}", "type": "function",
+                         "function": {"name": name, "arguments": json.dumps({"query": prompt, "topic": "technology"})}}
+        if payload.get("response_format", {}).get("type") == "json_object":
+            content = json_answer(prompt + json.dumps(messages[0]))
+        else:
+            content = answer_text(prompt)
+
+        if not payload.get("stream"):
+            message = {"role": "assistant", "content": None if tool_call else content}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                "index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"
+            }]}
+
+        async def chunks():
+            def chunk(delta, finish_reason=None):
+                body = {**base, "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                return f"data: {json.dumps(body)}\n\n"
+
+            if tool_call:
+                yield chunk({"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]})
+                yield chunk({}, "tool_calls")
+            else:
+                for word in content.split(" "):
+                    yield chunk({"content": word + " "})
+                    await asyncio.sleep(STREAM_TOKEN_MS / 1000)
+                yield chunk({}, "stop")
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    # ============= GEMINI =============
+
+    @app.get("/v1beta/models/{model}")
+    async def gemini_model(model: str):
+        await faults.delay("gemini")
+        return faults.fail("gemini") or {"name": f"models/{model}", "displayName": model}
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_generate(model_action: str, payload: dict):
+        await faults.delay("gemini")
+        failure = faults.fail("gemini")
+        if failure:
+            return failure
+        prompt = json.dumps(payload.get("contents", ""))
+        if (payload.get("generationConfig") or {}).get("responseMimeType") == "application/json":
+            content = json_answer(prompt)
+        else:
+            content = answer_text(prompt)
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": 60, "totalTokenCount": len(prompt) // 4 + 60}
+
+        def body(text, final=False):
+            out = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+            if final:
+                out["candidates"][0]["finishReason"] = "STOP"
+                out["usageMetadata"] = usage
+            return out
+
+        if not model_action.endswith(":streamGenerateContent"):
+            return body(content, final=True)
+
+        async def chunks():
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                yield f"data: {json.dumps(body(word + ' ', final=i == len(words) - 1))}\r\n\r\n"
+                await asyncio.sleep(STREAM_TOKEN_MS / 1000)
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    # ============= SUPABASE (PostgREST) =============
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def supabase_rpc(function: str, payload: dict):
+        await faults.delay("supabase")
+        failure = faults.fail("supabase")
+        if failure:
+            return failure
+        if function != "match_knowledge":
+            return JSONResponse(status_code=404, content={"message": f"function {function} not found"})
+        return store.match(**payload)
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def supabase_table(table: str, request: Request):
+        await faults.delay("supabase")
+        failure = faults.fail("supabase")
+        if failure:
+            return failure
+
+        params = request.query_params
+        filters = parse_filters(params)
+        rows = store.tables.setdefault(table, [])
+
+        if request.method == "POST":
+            payload = await request.json()
+            payload = payload if isinstance(payload, list) else [payload]
+            upsert_on = params.get("on_conflict") or ("user_id" if "merge-duplicates" in request.headers.get("prefer", "") else None)
+            result = [project(r, "*") for r in store.insert(table, payload, upsert_on=upsert_on)]
+        elif request.method == "PATCH":
+            changes = await request.json()
+            result = []
+            for r in rows:
+                if row_matches(r, filters):
+                    r.update(changes)
+                    result.append(project(r, "*"))
+            store._matrix = None
+        elif request.method == "DELETE":
+            result = [project(r, "*") for r in rows if row_matches(r, filters)]
+            store.tables[table] = [r for r in rows if not row_matches(r, filters)]
+            store._matrix = None
+        else:
+            matched = [r for r in rows if row_matches(r, filters)]
+            if params.get("order", "").startswith("id"):
+                matched.sort(key=lambda r: compare_key(r.get("id", 0)))
+            offset = int(params.get("offset", 0))
+            limit = int(params["limit"]) if "limit" in params else None
+            matched = matched[offset:offset + limit if limit is not None else None]
+            result = [project(r, params.get("select", "*")) for r in matched]
+
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(result) != 1:
+                return JSONResponse(status_code=406, content={"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"})
+            return result[0]
+        return result
+
+    # ============= GNEWS / RSS =============
+
+    @app.head("/")
+    async def gnews_root():
+        await faults.delay("gnews")
+        return faults.fail("gnews") or Response()
+
+    @app.get("/api/v4/{endpoint}")
+    async def gnews(endpoint: str, request: Request):
+        await faults.delay("gnews")
+        failure = faults.fail("gnews")
+        if failure:
+            return failure
+        query = request.query_params.get("q") or request.query_params.get("category", "technology")
+        return {"totalArticles": 10, "articles": [{
+            "title": f"{query} headline {i}", "description": f"What happened in {query} today ({i}).",
+            "content": "...", "url": f"https://example.com/news/{i}", "image": None,
+            "publishedAt": "2026-10-05T10:00:00Z", "source": {"name": "Bench Wire", "url": "https://example.com"}
+        } for i in range(10)]}
+
+    @app.get("/rss/{feed}.xml")
+    async def rss(feed: int, request: Request):
+        await faults.delay("rss")
+        failure = faults.fail("rss")
+        if failure:
+            return failure
+        etag = f'"bench-{feed}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(rss_document(feed), media_type="application/rss+xml", headers={"ETag": etag})
+
+    # ============= CONTROL =============
+
+    @app.get("/_bench/stats")
+    async def stats():
+        return {"calls": faults.calls, "injected_errors": faults.errors,
+                "knowledge_base_rows": len(store.tables["knowledge_base"])}
+
+    return app
+
+
+def parse_overrides(pairs: List[str], cast=float) -> Dict[str, float]:
+    """["openai=400", "all=50"] -> {"openai": 400.0, ...}; "all" applies to every upstream"""
+    out = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition("=")
+        names = UPSTREAMS if name == "all" else [name]
+        for upstream in names:
+            if upstream not in UPSTREAMS:
+                raise ValueError(f"Unknown upstream '{upstream}' (expected one of {', '.join(UPSTREAMS)} or all)")
+            out[upstream] = cast(value)
+    return out
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=MS", help="Base latency per upstream (repeatable; 'all' for every upstream)")
+    parser.add_argument("--jitter", action="append", metavar="UPSTREAM=MS", help="Extra uniform random latency per upstream")
+    parser.add_argument("--error-rate", action="append", metavar="UPSTREAM=FRACTION", help="Fraction of calls answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None, help="Seed for jitter and error injection")
+    parser.add_argument("--seed-documents", type=int, default=200, help="Synthetic knowledge_base rows to preload")
+
+
+def build_from_args(args) -> FastAPI:
+    faults = Faults(
+        latency=parse_overrides(args.latency),
+        jitter=parse_overrides(args.jitter),
+        error_rate=parse_overrides(args.error_rate),
+        error_status=args.error_status,
+        seed=args.seed
+    )
+    return create_app(faults, KnowledgeStore(args.seed_documents))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve local fake upstreams for benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_from_args(args), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,111 @@
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional
+
+HTML_TAG_RE = re.compile('<[^<]+?>')
+
+
+def clean_entry(entry) -> str:
+    title = getattr(entry, 'title', 'No Title')
+    summary = getattr(entry, 'summary', '')
+    if not summary and hasattr(entry, 'description'):
+        summary = entry.description
+
+    # Basic cleaning: remove HTML tags if any
+    clean_summary = HTML_TAG_RE.sub('', summary)
+    return f"{title} - {clean_summary[:200]}..."
+
+
+class FeedAggregator:
+    """
+    Background RSS aggregator.
+    Every feed is fetched concurrently with conditional GETs (ETag / Last-Modified),
+    parsed once, and the merged result is kept in memory for the request path.
+    """
+
+    def __init__(self, feeds: List[str], http, refresh_interval: float = 300, entries_per_feed: int = 5,
+                 max_concurrency: int = 16):
+        self.feeds = list(dict.fromkeys(feeds))
+        self.http = http
+        self.refresh_interval = refresh_interval
+        self.entries_per_feed = entries_per_feed
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self._entries: Dict[str, List[str]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self.articles: List[str] = []
+        self.last_refresh: Optional[float] = None
+        self.stats = {"refreshes": 0, "fetched": 0, "not_modified": 0, "errors": 0}
+
+    async def _fetch_feed(self, url: str):
+        headers = {}
+        validators = self._validators.get(url, {})
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        async with self._semaphore:
+            response = await self.http.get(url, headers=headers, upstream="rss")
+
+        if response.status_code == 304:
+            self.stats["not_modified"] += 1
+            return
+        response.raise_for_status()
+
+        import feedparser  # deferred: only the background refresh needs it
+        parsed = await asyncio.to_thread(feedparser.parse, response.content)
+        self._entries[url] = [clean_entry(entry) for entry in parsed.entries[:self.entries_per_feed]]
+        self._validators[url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
+        self.stats["fetched"] += 1
+
+    async def _refresh(self):
+        results = await asyncio.gather(
+            *[self._fetch_feed(url) for url in self.feeds],
+            return_exceptions=True
+        )
+        for url, result in zip(self.feeds, results):
+            if isinstance(result, Exception):
+                self.stats["errors"] += 1
+                print(f"Error parsing feed {url}: {result}")
+
+        # Merge in configured feed order; feeds that failed keep their previous entries
+        self.articles = [article for url in self.feeds for article in self._entries.get(url, [])]
+        self.last_refresh = time.time()
+        self.stats["refreshes"] += 1
+
+    async def refresh(self):
+        """Refresh all feeds; concurrent callers share one in-flight refresh"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refresh_task)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Feed refresh error: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "feeds": len(self.feeds),
+            "articles": len(self.articles),
+            "age_seconds": round(time.time() - self.last_refresh, 1) if self.last_refresh else None,
+        }
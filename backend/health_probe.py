@@ -0,0 +1,72 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class HealthProber:
+    """
+    Background dependency prober.
+    Each probe is an async callable that raises on failure; results (status, latency,
+    error, timestamp) are cached so health endpoints never do I/O themselves.
+    A probe returning the string "not_configured" is recorded as such.
+    """
+
+    def __init__(self, probes: Dict[str, Callable[[], Awaitable[Any]]], interval: float = 30, timeout: float = 5):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.last_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(probe(), timeout=self.timeout)
+            status, error = ("not_configured", None) if outcome == "not_configured" else ("ok", None)
+        except asyncio.TimeoutError:
+            status, error = "error", f"timed out after {self.timeout}s"
+        except Exception as e:
+            status, error = "error", str(e)
+        self.results[name] = {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error,
+            "checked_at": time.time(),
+        }
+
+    async def run_once(self):
+        await asyncio.gather(*[self._probe(name, probe) for name, probe in self.probes.items()])
+        self.last_run = time.time()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Health probe error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self, name: str) -> Optional[str]:
+        result = self.results.get(name)
+        return result["status"] if result else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "age_seconds": round(now - self.last_run, 1) if self.last_run else None,
+            "interval_seconds": self.interval,
+            "checks": {
+                name: {**result, "age_seconds": round(now - result["checked_at"], 1)}
+                for name, result in self.results.items()
+            },
+        }
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+Candidate = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _consume(task: asyncio.Task):
+    # Losers may fail after we stop watching them; retrieve the exception so it is not logged as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+class Hedger:
+    """
+    Deadline-aware hedged calls across two providers.
+    The primary starts immediately; if it has not succeeded within hedge_delay (or fails earlier),
+    the secondary is started with the same work. The first success wins and the other call is
+    cancelled. Everything is bounded by the latency budget.
+    hedge_delay=None disables hedging: the secondary is then only used when the primary fails.
+    """
+
+    def __init__(self, budget: float, hedge_delay: Optional[float], track: Optional[Callable[[str], None]] = None):
+        self.budget = budget
+        self.hedge_delay = hedge_delay
+        # Called with the event name ("hedged", "failover", "win_<provider>", "failed", "deadline_exceeded")
+        self.track = track
+        self.stats = {"requests": 0, "hedged": 0, "failover": 0, "failed": 0, "deadline_exceeded": 0}
+        self.wins: Dict[str, int] = {}
+        self.contested_wins: Dict[str, int] = {}
+
+    def _event(self, event: str):
+        if event in self.stats:
+            self.stats[event] += 1
+        if self.track:
+            self.track(event)
+
+    async def run(self, primary: Candidate, secondary: Optional[Candidate] = None,
+                  budget: Optional[float] = None) -> Tuple[Any, str]:
+        """Return (result, provider name) of the first successful candidate"""
+        loop = asyncio.get_running_loop()
+        budget = budget or self.budget
+        started = loop.time()
+        deadline = started + budget
+        # A short budget pulls the hedge forward so the secondary still has time to answer
+        hedge_at = None if self.hedge_delay is None else started + min(self.hedge_delay, budget / 2)
+        self.stats["requests"] += 1
+
+        def launch(candidate: Candidate) -> asyncio.Task:
+            task = asyncio.create_task(candidate[1]())
+            task.add_done_callback(_consume)
+            tasks[task] = candidate[0]
+            return task
+
+        tasks: Dict[asyncio.Task, str] = {}
+        launch(primary)
+        pending_secondary = secondary
+        last_error: Optional[BaseException] = None
+        try:
+            while True:
+                now = loop.time()
+                if now >= deadline:
+                    self._event("deadline_exceeded")
+                    raise DeadlineExceeded(f"no answer within {budget:.1f}s")
+
+                if pending_secondary and (not tasks or (hedge_at is not None and now >= hedge_at)):
+                    self._event("hedged" if tasks else "failover")
+                    launch(pending_secondary)
+                    pending_secondary = None
+                    continue
+                if not tasks:
+                    self._event("failed")
+                    raise last_error or RuntimeError("no candidates")
+
+                wake = deadline
+                if pending_secondary and hedge_at is not None:
+                    wake = min(wake, hedge_at)
+                done, _ = await asyncio.wait(tasks, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        self.wins[name] = self.wins.get(name, 0) + 1
+                        if secondary and pending_secondary is None:
+                            self.contested_wins[name] = self.contested_wins.get(name, 0) + 1
+                        self._event(f"win_{name}")
+                        return task.result(), name
+                    last_error = task.exception()
+                    print(f"Hedged call {name} failed: {last_error}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        hedged = self.stats["hedged"]
+        return {
+            "budget_seconds": self.budget,
+            "hedge_delay_seconds": self.hedge_delay,
+            **self.stats,
+            "hedge_rate": round(hedged / requests, 4) if requests else 0.0,
+            "wins": dict(self.wins),
+            "win_rate": {name: round(count / requests, 4) for name, count in self.wins.items()} if requests else {},
+            # Among calls where both providers were racing (hedged or failed over)
+            "contested_wins": dict(self.contested_wins),
+        }
@@ -1,11 +1,16 @@
 import requests
 import json
 import os
+import re
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 
 load_dotenv()
 
-BACKEND_URL = "http://localhost:8000"
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+BATCH_SIZE = 100
+CONCURRENCY = 4
 
 # Initial knowledge data
 KNOWLEDGE_DATA = [
@@ -31,18 +36,138 @@ KNOWLEDGE_DATA = [
     }
 ]
 
-def ingest_data():
+def read_jsonl(path):
+    """
+    Yield {"document_id", "content", "source"} documents from a JSONL file, one per line.
+    Every line needs a stable "id" (or "document_id"): re-ingesting replaces that document's
+    chunks, so ids derived from line numbers would shift and orphan chunks as the file changes.
+    """
+    default_source = os.path.basename(path)
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping {path}:{line_no}: {e}")
+                continue
+            if not isinstance(doc, dict):
+                print(f"Skipping {path}:{line_no}: expected a JSON object")
+                continue
+            if not doc.get("content"):
+                continue
+            doc_id = doc.get("id") or doc.get("document_id")
+            if not doc_id:
+                print(f"Skipping {path}:{line_no}: no \"id\" field")
+                continue
+            yield {
+                "document_id": str(doc_id),
+                "content": doc["content"],
+                "source": doc.get("source", default_source)
+            }
+
+def read_markdown(path):
+    """Yield one document per heading section of a Markdown file, identified by file and heading"""
+    default_source = os.path.basename(path)
+    seen = {}
+
+    def document(lines):
+        heading = lines[0].lstrip("#").strip() if lines[0].startswith("#") else ""
+        # Repeated headings get a counter so each section keeps a stable id
+        seen[heading] = seen.get(heading, 0) + 1
+        suffix = f"~{seen[heading]}" if seen[heading] > 1 else ""
+        return {"document_id": f"{default_source}#{heading}{suffix}", "content": "".join(lines).strip(), "source": default_source}
+
+    section = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if re.match(r"^#{1,3} ", line) and "".join(section).strip():
+                yield document(section)
+                section = []
+            section.append(line)
+    if "".join(section).strip():
+        yield document(section)
+
+def iter_documents(paths):
+    if not paths:
+        for i, doc in enumerate(KNOWLEDGE_DATA):
+            yield {"document_id": f"seed:{i}", **doc}
+        return
+
+    for path in paths:
+        if os.path.isdir(path):
+            children = sorted(os.path.join(path, name) for name in os.listdir(path))
+            yield from iter_documents(children)
+        elif path.endswith(".jsonl"):
+            yield from read_jsonl(path)
+        elif path.endswith((".md", ".markdown")):
+            yield from read_markdown(path)
+
+def iter_batches(documents, batch_size):
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def post_batch(session, batch):
+    response = session.post(f"{BACKEND_URL}/rag/ingest/batch", json={"documents": batch}, timeout=(5, 300))
+    if response.status_code != 200:
+        return {"documents": 0, "failed": len(batch), "error": response.text}
+    return response.json()["data"]
+
+def ingest_data(paths=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
     print(f"Starting ingestion to {BACKEND_URL}...")
 
-    for item in KNOWLEDGE_DATA:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    totals = {"documents": 0, "failed": 0, "embedded": 0, "skipped": 0, "deleted": 0}
+
+    def collect(future):
         try:
-            response = requests.post(f"{BACKEND_URL}/rag/ingest", json=item)
-            if response.status_code == 200:
-                print(f"Successfully ingested: {item['content'][:50]}...")
-            else:
-                print(f"Failed to ingest: {item['content'][:50]}. Error: {response.text}")
+            result = future.result()
         except Exception as e:
             print(f"Error connecting to backend: {e}")
+            return
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        for item in result.get("items", []):
+            if item["status"] != "ok":
+                print(f"Failed item {item['index']}: {item.get('error')}")
+        if result.get("error"):
+            print(f"Batch rejected: {result['error']}")
+        print(f"Progress: {totals['documents']} documents, {totals['failed']} failed")
+
+    # Keep at most `concurrency` batches in flight so large corpora stream with bounded memory
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in iter_batches(iter_documents(paths), batch_size):
+            if len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            in_flight.add(pool.submit(post_batch, session, batch))
+        for future in in_flight:
+            collect(future)
+
+    print(
+        f"Ingestion complete: {totals['documents']} documents, {totals['failed']} failed; "
+        f"chunks: {totals['embedded']} embedded, {totals['skipped']} unchanged, {totals['deleted']} removed"
+    )
+    return totals
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Stream documents into the knowledge base")
+    parser.add_argument("paths", nargs="*", help="JSONL/Markdown files or directories (defaults to the built-in seed data)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+    ingest_data(args.paths, batch_size=args.batch_size, concurrency=args.concurrency)
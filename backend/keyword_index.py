@@ -0,0 +1,160 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Keeps terms like "c++", "c#", "node.js" and "gpt-4o" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its me my of on or
+should so than that the their them then there these they this to was we what when where which
+who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# Words that name a thing rather than describe it: digits or symbols ("gpt-4o", "c++", "node.js"),
+# inner capitals ("LeetCode") or acronyms ("AWS")
+IDENTIFIER_PATTERN = re.compile(r"\d|[+#]|\w[.\-]\w|[a-z][A-Z]|[A-Z]{2,}")
+
+
+def is_lexical_query(query: str, index: "KeywordIndex", max_words: int = 3, min_idf: float = 5.0) -> bool:
+    """
+    A quoted phrase, or a few words that are each an indexed identifier ("LeetCode", "gpt-4o") or
+    a rare indexed term (idf of at least min_idf), is answered by keyword search alone. Everyday
+    words ("career skills", "system design") need the vector side, so those queries stay hybrid.
+    """
+    text = query.strip()
+    if len(text) > 2 and text[0] == text[-1] == '"':
+        return True
+    words = text.split()
+    if not words or len(words) > max_words:
+        return False
+    for word in words:
+        terms = tokenize(word)
+        if not terms or not all(index.has_term(t) for t in terms):
+            return False
+        if not IDENTIFIER_PATTERN.search(word) and min(index.idf(t) for t in terms) < min_idf:
+            return False
+    return True
+
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Dict[str, Any]]], k: int = 60,
+                           limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Merge best-first result lists by summing 1 / (k + rank) per document id.
+    Each fused row keeps the fields of every list it appeared in plus "score" and "matched_by".
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for name, rows in ranked_lists.items():
+        for rank, row in enumerate(rows, start=1):
+            doc_id = str(row["id"])
+            entry = fused.setdefault(doc_id, {"score": 0.0, "matched_by": []})
+            entry.update({key: value for key, value in row.items() if key not in entry or entry[key] is None})
+            entry["score"] += 1.0 / (k + rank)
+            entry["matched_by"].append(name)
+    ranked = sorted(fused.values(), key=lambda r: r["score"], reverse=True)
+    return ranked[:limit] if limit is not None else ranked
+
+
+class KeywordIndex:
+    """
+    In-process BM25 inverted index over knowledge_base content.
+    Postings map term -> {doc id: term frequency}; documents can be added, replaced
+    and removed one at a time, so ingestion keeps it current without a rebuild.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def has_term(self, term: str) -> bool:
+        return term in self._postings
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency; higher for rarer terms, 0.0 for unseen ones"""
+        with self._lock:
+            return self._idf(len(self._postings.get(term) or ()))
+
+    def _idf(self, df: int) -> float:
+        if not df:
+            return 0.0
+        n = len(self._rows)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def add(self, rows: List[Dict[str, Any]]):
+        """Insert or replace rows shaped like knowledge_base records ({id, content, source})"""
+        with self._lock:
+            for r in rows:
+                if not r.get("content"):
+                    continue
+                doc_id = str(r["id"])
+                self.remove([doc_id])
+                counts = Counter(tokenize(r["content"]))
+                for term, tf in counts.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+                length = sum(counts.values())
+                self._lengths[doc_id] = length
+                self._total_length += length
+                self._rows[doc_id] = {"id": doc_id, "content": r["content"], "source": r.get("source")}
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                doc_id = str(doc_id)
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                for term in set(tokenize(row["content"])):
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self._postings[term]
+                self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 5, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top-k rows by BM25 score, best first, as {id, content, source, keyword_score}"""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._rows)
+            if not terms or n == 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = self._idf(len(postings))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if source is not None:
+                scores = {doc_id: s for doc_id, s in scores.items() if self._rows[doc_id]["source"] == source}
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [{**self._rows[doc_id], "keyword_score": score} for doc_id, score in top]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._rows)
+            return {
+                "ready": self.ready,
+                "rows": n,
+                "terms": len(self._postings),
+                "avg_document_terms": round(self._total_length / n, 1) if n else 0.0,
+            }
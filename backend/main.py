@@ -1,51 +1,510 @@
-from fastapi import FastAPI, Request, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, APIRouter, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import os
-import requests
-import feedparser
 from dotenv import load_dotenv
 import json
+import hashlib
+import random
+from array import array
+import threading
+import time
 from datetime import datetime
 
 load_dotenv()
 
-from supabase import create_client, Client
-from openai import OpenAI
-from google import genai
 import logging
+import sys
+
+from embedding_cache import EmbeddingCache, cache_key as embedding_cache_key
+from vector_index import VectorIndex, parse_embedding
+from chunking import chunk_text, content_hash, estimate_tokens
+from keyword_index import KeywordIndex, is_lexical_query, reciprocal_rank_fusion
+from reranking import diversify, pack_to_budget
+from ttl_cache import TTLCache
+from feed_aggregator import FeedAggregator
+from semantic_cache import SemanticCache
+from upstream_http import UpstreamHTTP
+from health_probe import HealthProber
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hedging import Hedger, DeadlineExceeded
+from rate_scheduler import RateLimitScheduler, retry_after_seconds
+from single_flight import SingleFlight
+from metrics import (
+    REGISTRY, REQUEST_LATENCY, FALLBACKS, CIRCUIT_STATE, HEDGE_EVENTS,
+    OPENAI_QUEUE_DEPTH, OPENAI_QUEUE_WAIT, OPENAI_RATE_LIMITED, SINGLE_FLIGHT_CALLS, INGEST_CHUNKS, track_upstream, record_openai_usage, record_gemini_usage
+)
+from phase_timing import start_request, phase
+
+# Upstream concurrency limits (max in-flight calls per provider, per worker)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+
+# OpenAI rate limits for the account tier (0 disables a bucket); calls queue by priority
+# chat > assessment > opportunities > ingestion, and a 429 pauses the queue for its Retry-After
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+OPENAI_EMBEDDING_RPM_LIMIT = float(os.getenv("OPENAI_EMBEDDING_RPM_LIMIT", "3000"))
+OPENAI_EMBEDDING_TPM_LIMIT = float(os.getenv("OPENAI_EMBEDDING_TPM_LIMIT", "1000000"))
+OPENAI_RATE_LIMIT_RETRIES = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "2"))
+
+# Embedding profile: text-embedding-3 models can return shorter vectors via the dimensions
+# parameter (e.g. 512). knowledge_base must be re-embedded when this changes (see reembed.py).
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_NATIVE_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(EMBEDDING_NATIVE_DIMENSIONS)))
+# Cache namespace: vectors of different sizes must never be served for each other
+EMBEDDING_PROFILE = EMBEDDING_MODEL if EMBEDDING_DIMENSIONS == EMBEDDING_NATIVE_DIMENSIONS else f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSIONS}"
+
+# Embedding cache (set EMBEDDING_CACHE_PATH to an empty string to keep it memory-only);
+# EMBEDDING_CACHE_STORAGE=float16 or int8 shrinks cached vectors 2x / 4x (query embeddings only:
+# ingestion bypasses a lossy cache so knowledge_base always gets full-precision vectors)
+EMBEDDING_CACHE_STORAGE = os.getenv("EMBEDDING_CACHE_STORAGE", "float32")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings.sqlite3")
+)
 
-# Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_client = None
-if GEMINI_API_KEY:
-    try:
-        gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        print(f"Failed to initialize Gemini client: {e}")
-import json
-import traceback
+# Bulk ingestion limits (token counts are estimated at ~4 characters per token)
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "512"))
+INGEST_BATCH_MAX_DOCUMENTS = int(os.getenv("INGEST_BATCH_MAX_DOCUMENTS", "2000"))
+# Documents are split into chunks of this size, each repeating the tail of the previous one
+INGEST_CHUNK_TOKENS = min(int(os.getenv("INGEST_CHUNK_TOKENS", "400")), EMBEDDING_MAX_INPUT_TOKENS)
+INGEST_CHUNK_OVERLAP_TOKENS = int(os.getenv("INGEST_CHUNK_OVERLAP_TOKENS", "60"))
+# Document ids per PostgREST in.() filter (keeps lookup URLs short)
+INGEST_LOOKUP_PAGE_SIZE = 100
+
+# Shared upstream HTTP pool (GNews, RSS and other third-party fetchers)
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_CONNECTIONS_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONNECTIONS_PER_HOST", "20"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Background health probing (/health serves the cached snapshot)
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+HEALTH_READY_REQUIRES = [name.strip() for name in os.getenv("HEALTH_READY_REQUIRES", "supabase").split(",") if name.strip()]
+
+# Circuit breakers (per upstream: open after N consecutive failures, trial call after the recovery window)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+
+# Hedged requests: overall latency budget per request (overridable per call via latency_budget_ms)
+# and how long the primary (OpenAI) gets before the same work is also sent to Gemini
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+CHAT_LATENCY_BUDGET_SECONDS = float(os.getenv("CHAT_LATENCY_BUDGET_SECONDS", "20"))
+CHAT_HEDGE_DELAY_SECONDS = float(os.getenv("CHAT_HEDGE_DELAY_SECONDS", "6"))
+ASSESSMENT_LATENCY_BUDGET_SECONDS = float(os.getenv("ASSESSMENT_LATENCY_BUDGET_SECONDS", "45"))
+ASSESSMENT_HEDGE_DELAY_SECONDS = float(os.getenv("ASSESSMENT_HEDGE_DELAY_SECONDS", "15"))
+
+# Per-request phase timings (Server-Timing header; JSON log line for a sampled fraction of requests)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0"))
+
+# GNews cache (fresh for NEWS_CACHE_TTL_SECONDS, then served stale while refreshing)
+NEWS_CACHE_TTL_SECONDS = float(os.getenv("NEWS_CACHE_TTL_SECONDS", "600"))
+NEWS_CACHE_STALE_SECONDS = float(os.getenv("NEWS_CACHE_STALE_SECONDS", "3600"))
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "256"))
+
+# RSS aggregator (extra feeds can be appended as a comma-separated RSS_FEEDS list;
+# RSS_DEFAULT_FEEDS=false drops the built-in feeds, e.g. to benchmark against local stand-ins)
+RSS_DEFAULT_FEEDS = os.getenv("RSS_DEFAULT_FEEDS", "true").lower() == "true"
+RSS_REFRESH_SECONDS = float(os.getenv("RSS_REFRESH_SECONDS", "300"))
+RSS_MAX_CONCURRENCY = int(os.getenv("RSS_MAX_CONCURRENCY", "16"))
+RSS_EXTRA_FEEDS = [url.strip() for url in os.getenv("RSS_FEEDS", "").split(",") if url.strip()]
+
+# Assessment result cache (entries are also keyed by prompt version and calendar day)
+ASSESSMENT_PROMPT_VERSION = "2"
+ASSESSMENT_CACHE_TTL_SECONDS = float(os.getenv("ASSESSMENT_CACHE_TTL_SECONDS", "21600"))
+ASSESSMENT_CACHE_MAX_ENTRIES = int(os.getenv("ASSESSMENT_CACHE_MAX_ENTRIES", "1000"))
+
+# Semantic answer cache for /chat/ask (cosine similarity of query embeddings)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_NEAR_MISS_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_NEAR_MISS_THRESHOLD", "0.90"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+# Agent loop limits
+AGENT_MAX_TOOL_ROUNDS = int(os.getenv("AGENT_MAX_TOOL_ROUNDS", "2"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "8"))
+
+# Local vector index (in-process mirror of knowledge_base, falls back to the RPC until warmed)
+# Retrieval defaults (match_knowledge): rows returned, similarity floor, HNSW candidate list size
+RAG_MATCH_COUNT = int(os.getenv("RAG_MATCH_COUNT", "5"))
+RAG_MIN_SIMILARITY = float(os.getenv("RAG_MIN_SIMILARITY", "0.2"))
+RAG_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "40"))
+
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+VECTOR_INDEX_PAGE_SIZE = int(os.getenv("VECTOR_INDEX_PAGE_SIZE", "1000"))
+# A failed warm-up is retried with exponential backoff up to this many seconds between attempts
+VECTOR_INDEX_WARM_RETRY_MAX_SECONDS = float(os.getenv("VECTOR_INDEX_WARM_RETRY_MAX_SECONDS", "60"))
+# float32, float16 (2x smaller) or int8 (4x smaller); compact storage rescores the top
+# candidates against float32 copies in a temporary file under VECTOR_INDEX_RESCORE_DIR
+VECTOR_INDEX_STORAGE = os.getenv("VECTOR_INDEX_STORAGE", "float32")
+VECTOR_INDEX_RESCORE = os.getenv("VECTOR_INDEX_RESCORE", "true").lower() in ("1", "true", "yes")
+VECTOR_INDEX_RESCORE_DIR = os.getenv("VECTOR_INDEX_RESCORE_DIR") or None
+
+# Local BM25 index over knowledge_base content for exact-term matches ("LeetCode", course names).
+# Opt-in like the vector index: each worker pages the whole table into memory at startup
+KEYWORD_INDEX_ENABLED = os.getenv("KEYWORD_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+# Retrieval mode when a request does not pick one: vector, keyword, hybrid, or auto
+# (without the keyword index every mode searches vectors; auto = keyword only for quoted phrases and identifier-like or rare terms, hybrid otherwise)
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "auto")
+RAG_SEARCH_MODES = ("vector", "keyword", "hybrid", "auto")
+# BM25 idf a plain word needs to count as rare in auto mode (5.0 ~ in under 1% of documents)
+RAG_LEXICAL_MIN_IDF = float(os.getenv("RAG_LEXICAL_MIN_IDF", "5.0"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidates fetched from each engine before fusion, as a multiple of the requested count
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "4"))
+
+# Post-retrieval re-ranking: over-fetch candidates, pick a diverse subset by maximal marginal
+# relevance (lambda 1 = relevance only), drop near-duplicates, and fit the agent's context budget
+RAG_RERANK_ENABLED = os.getenv("RAG_RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "20"))
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+RAG_DUPLICATE_SIMILARITY = float(os.getenv("RAG_DUPLICATE_SIMILARITY", "0.95"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1200"))
 
-# Environment Validation
+import traceback
 
-# Environment Validation
+# Environment Validation (enforced in the lifespan so the module stays importable without keys)
 REQUIRED_ENV = ["SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "OPENAI_API_KEY"]
-missing_env = [env for env in REQUIRED_ENV if not os.getenv(env)]
-if missing_env:
-    raise ValueError(f"Missing required environment variables: {', '.join(missing_env)}")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Upstream endpoint overrides (unset means the provider's public API)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+GNEWS_BASE_URL = os.getenv("GNEWS_BASE_URL", "https://gnews.io").rstrip("/")
+
+def validate_environment():
+    missing_env = [env for env in REQUIRED_ENV if not os.getenv(env)]
+    if missing_env:
+        raise ValueError(f"Missing required environment variables: {', '.join(missing_env)}")
+
+# Clients are built on first use; the SDK imports alone cost seconds of cold start, so
+# warm_clients builds them in a worker thread at startup (the lock keeps that to one build each)
+_supabase = None
+_openai_client = None
+_gemini_client = None
+_clients_lock = threading.Lock()
+
+def get_supabase():
+    global _supabase
+    with _clients_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase
+
+def get_openai_client():
+    global _openai_client
+    with _clients_lock:
+        if _openai_client is None and OPENAI_API_KEY:
+            from openai import AsyncOpenAI
+            # Retries of 429s are left to call_openai's scheduler, which honours the rate-limit budget
+            _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+    return _openai_client
+
+def get_gemini_client():
+    global _gemini_client
+    with _clients_lock:
+        if _gemini_client is None and GEMINI_API_KEY:
+            try:
+                from google import genai
+                http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+                _gemini_client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+            except Exception as e:
+                print(f"Failed to initialize Gemini client: {e}")
+    return _gemini_client
+
+async def warm_clients():
+    """Build every client in a worker thread so the SDK imports never stall the event loop"""
+    for getter in (get_supabase, get_openai_client, get_gemini_client):
+        try:
+            await asyncio.to_thread(getter)
+        except Exception as e:
+            print(f"Client warm-up failed in {getter.__name__}: {e}")
+
+upstream_http = UpstreamHTTP(
+    track=track_upstream,
+    connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+    read_timeout=UPSTREAM_READ_TIMEOUT,
+    max_connections=UPSTREAM_MAX_CONNECTIONS,
+    max_per_host=UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+    http2=UPSTREAM_HTTP2
+)
+
+openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, path=EMBEDDING_CACHE_PATH or None, storage=EMBEDDING_CACHE_STORAGE)
+
+breakers = {
+    name: CircuitBreaker(
+        name,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout=CIRCUIT_RECOVERY_SECONDS,
+        half_open_max_calls=CIRCUIT_HALF_OPEN_MAX_CALLS
+    )
+    for name in ("openai_chat", "openai_embeddings", "gemini", "supabase", "gnews")
+}
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+chat_hedger = Hedger(
+    budget=CHAT_LATENCY_BUDGET_SECONDS,
+    hedge_delay=CHAT_HEDGE_DELAY_SECONDS if HEDGING_ENABLED else None,
+    track=lambda event: HEDGE_EVENTS.inc(endpoint="chat", event=event)
+)
+assessment_hedger = Hedger(
+    budget=ASSESSMENT_LATENCY_BUDGET_SECONDS,
+    hedge_delay=ASSESSMENT_HEDGE_DELAY_SECONDS if HEDGING_ENABLED else None,
+    track=lambda event: HEDGE_EVENTS.inc(endpoint="assessment", event=event)
+)
+
+def latency_budget(value, default):
+    """Seconds from a client-supplied latency_budget_ms, or the endpoint default"""
+    try:
+        return float(value) / 1000 if value and float(value) > 0 else default
+    except (TypeError, ValueError):
+        return default
+
+CIRCUIT_STATE.set_function(lambda: {(name, ): CIRCUIT_STATE_VALUES[b.state] for name, b in breakers.items()})
+
+# Concurrent identical upstream calls share one in-flight request
+flights = {
+    name: SingleFlight(name, track=lambda role, name=name: SINGLE_FLIGHT_CALLS.inc(call=name, role=role))
+    for name in ("gnews", "embedding", "match_knowledge", "assessment")
+}
 
-app = FastAPI(title="Edu AI Career Growth Agent API")
+# Chat completions and embeddings have separate limits on the OpenAI side
+openai_schedulers = {
+    group: RateLimitScheduler(
+        f"openai_{group}", rpm=rpm, tpm=tpm,
+        observe_wait=lambda priority, seconds, group=group: OPENAI_QUEUE_WAIT.observe(seconds, group=group, priority=priority)
+    )
+    for group, rpm, tpm in (
+        ("chat", OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT),
+        ("embeddings", OPENAI_EMBEDDING_RPM_LIMIT, OPENAI_EMBEDDING_TPM_LIMIT)
+    )
+}
+OPENAI_QUEUE_DEPTH.set_function(lambda: {
+    (group, priority): depth
+    for group, scheduler in openai_schedulers.items()
+    for priority, depth in scheduler.queue_depths().items()
+})
+
+# ============= ASYNC UPSTREAM LAYER =============
+
+def estimate_request_tokens(kwargs):
+    """Rough TPM cost of a request: ~4 characters per prompt token plus the completion allowance"""
+    if "messages" in kwargs:
+        text = "".join(
+            str(m.get("content") or "") if isinstance(m, dict) else str(getattr(m, "content", None) or "")
+            for m in kwargs["messages"]
+        ) + json.dumps(kwargs.get("tools") or [])
+    else:
+        inputs = kwargs.get("input") or ""
+        text = "".join(inputs) if isinstance(inputs, list) else inputs
+    return max(1, len(text) // 4) + (kwargs.get("max_tokens") or 0)
+
+def note_rate_limit(group, error):
+    """On a 429, pause the whole queue for the server's Retry-After; returns True if it was one"""
+    if getattr(error, "status_code", None) != 429:
+        return False
+    OPENAI_RATE_LIMITED.inc(group=group)
+    openai_schedulers[group].pause(retry_after_seconds(getattr(getattr(error, "response", None), "headers", None)))
+    return True
+
+async def call_openai(group, priority, create, kwargs):
+    """
+    Queue for rate-limit admission, then call; 429s are retried once the pause has passed.
+    Estimated tokens are reserved once per call (retries only take a request slot) and
+    refunded if the call fails.
+    """
+    scheduler = openai_schedulers[group]
+    estimated = estimate_request_tokens(kwargs)
+    for attempt in range(OPENAI_RATE_LIMIT_RETRIES + 1):
+        await scheduler.acquire(priority, estimated if attempt == 0 else 0)
+        try:
+            async with openai_semaphore:
+                with breakers[f"openai_{group}"].guard(), track_upstream(f"openai_{group}"):
+                    response = await create(**kwargs)
+            break
+        except Exception as e:
+            if not note_rate_limit(group, e) or attempt == OPENAI_RATE_LIMIT_RETRIES:
+                scheduler.refund(estimated)
+                raise
+    scheduler.settle(estimated, getattr(response.usage, "total_tokens", None))
+    record_openai_usage(kwargs.get("model"), response.usage)
+    return response
+
+async def openai_chat(priority="chat", **kwargs):
+    """Await a chat completion without blocking the event loop"""
+    return await call_openai("chat", priority, get_openai_client().chat.completions.create, kwargs)
+
+async def openai_embed(priority="chat", **kwargs):
+    """Await an embeddings request without blocking the event loop"""
+    return await call_openai("embeddings", priority, get_openai_client().embeddings.create, kwargs)
+
+async def openai_chat_stream(priority="chat", **kwargs):
+    """Yield chat completion chunks while holding an OpenAI concurrency slot"""
+    estimated = estimate_request_tokens(kwargs)
+    await openai_schedulers["chat"].acquire(priority, estimated)
+    async with openai_semaphore:
+        with breakers["openai_chat"].guard(), track_upstream("openai_chat"):
+            try:
+                stream = await get_openai_client().chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+            except Exception as e:
+                note_rate_limit("chat", e)
+                openai_schedulers["chat"].refund(estimated)
+                raise
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    openai_schedulers["chat"].settle(estimated, chunk.usage.total_tokens)
+                    record_openai_usage(kwargs.get("model"), chunk.usage)
+                yield chunk
+
+async def gemini_generate(model: str, contents: str, config=None):
+    """Await a Gemini completion through the client's async surface"""
+    gemini_client = get_gemini_client()
+    if not gemini_client:
+        raise ValueError("Gemini client not configured")
+    async with gemini_semaphore:
+        with breakers["gemini"].guard(), track_upstream("gemini"):
+            response = await gemini_client.aio.models.generate_content(model=model, contents=contents, config=config)
+    record_gemini_usage(model, getattr(response, "usage_metadata", None))
+    return response
+
+async def gemini_generate_stream(model: str, contents: str):
+    """Yield Gemini response chunks while holding a Gemini concurrency slot"""
+    gemini_client = get_gemini_client()
+    if not gemini_client:
+        raise ValueError("Gemini client not configured")
+    async with gemini_semaphore:
+        with breakers["gemini"].guard(), track_upstream("gemini"):
+            usage_metadata = None
+            async for chunk in await gemini_client.aio.models.generate_content_stream(model=model, contents=contents):
+                usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+                yield chunk
+            record_gemini_usage(model, usage_metadata)
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a synchronous call (the Supabase client) in the default thread pool"""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+async def supabase_execute(query):
+    """Execute a Supabase query builder off the event loop, timed as the supabase upstream"""
+    with breakers["supabase"].guard(), track_upstream("supabase"):
+        return await run_blocking(query.execute)
+
+vector_index = VectorIndex(
+    dim=EMBEDDING_DIMENSIONS,
+    storage=VECTOR_INDEX_STORAGE,
+    rescore=VECTOR_INDEX_RESCORE,
+    rescore_dir=VECTOR_INDEX_RESCORE_DIR
+) if VECTOR_INDEX_ENABLED else None
+keyword_index = KeywordIndex() if KEYWORD_INDEX_ENABLED else None
+
+semantic_cache = SemanticCache(
+    dim=EMBEDDING_DIMENSIONS,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    near_miss_threshold=SEMANTIC_CACHE_NEAR_MISS_THRESHOLD,
+    ttl=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES
+) if SEMANTIC_CACHE_ENABLED else None
+
+# Row ids deleted while an index is warming: a page read before the delete would bring them back,
+# so warm_index removes them again once it has loaded every page
+warm_removals: Dict[Any, set] = {}
+
+def remove_from_indexes(ids: List[str]):
+    for index in (vector_index, keyword_index):
+        if index is None:
+            continue
+        index.remove(ids)
+        if not index.ready:
+            warm_removals.setdefault(index, set()).update(str(i) for i in ids)
+
+async def warm_index(index, name: str, columns: str):
+    """
+    Page every knowledge_base row into a local index (keyset pagination), then start serving from it.
+    Failures (e.g. Supabase down at boot) are retried with backoff, resuming after the last loaded page.
+    """
+    last_id = None
+    backoff = 1.0
+    try:
+        while True:
+            try:
+                query = get_supabase().table("knowledge_base").select(columns).order("id").limit(VECTOR_INDEX_PAGE_SIZE)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                res = await supabase_execute(query)
+            except Exception as e:
+                # An open circuit says when it will let calls through again
+                delay = max(backoff, getattr(e, "retry_in", 0))
+                print(f"{name} index warm-up failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, VECTOR_INDEX_WARM_RETRY_MAX_SECONDS)
+                continue
+            backoff = 1.0
+            index.add(res.data)
+            if len(res.data) < VECTOR_INDEX_PAGE_SIZE:
+                break
+            last_id = res.data[-1]["id"]
+        index.remove(list(warm_removals.pop(index, ())))
+        index.ready = True
+        print(f"{name} index warmed with {len(index)} rows")
+    except Exception as e:
+        # Bad rows (e.g. embeddings of another size) will not get better by retrying
+        print(f"{name} index warm-up failed: {e}")
+    finally:
+        warm_removals.pop(index, None)
+
+async def warm_up():
+    """Build the clients off the event loop, then start the work that uses them"""
+    await warm_clients()
+    health_prober.start()
+    warm_tasks = []
+    if vector_index is not None:
+        warm_tasks.append(warm_index(vector_index, "Vector", "id, content, source, embedding"))
+    if keyword_index is not None:
+        warm_tasks.append(warm_index(keyword_index, "Keyword", "id, content, source"))
+    await asyncio.gather(*warm_tasks)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    validate_environment()
+    await upstream_http.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    feed_aggregator.start()
+    app.state.started = True
+    yield
+    app.state.started = False
+    health_prober.stop()
+    feed_aggregator.stop()
+    warm_up_task.cancel()
+    await upstream_http.close()
+
+app = FastAPI(title="Edu AI Career Growth Agent API", lifespan=lifespan)
 
 # Routers
 assessment_router = APIRouter(prefix="/assessment", tags=["Assessment"])
@@ -63,6 +522,48 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"data": None, "error": str(exc)}
     )
 
+ROUTER_NAMES = {"assessment", "opportunities", "chat", "profile", "news", "rag"}
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    timings = start_request()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = timings.server_timing()
+            # Lets the frontend's Resource Timing API (and DevTools) see the phases cross-origin
+            response.headers["Timing-Allow-Origin"] = "*"
+        if REQUEST_LOG_SAMPLE_RATE > 0 and random.random() < REQUEST_LOG_SAMPLE_RATE:
+            response.body_iterator = log_after_body(response.body_iterator, request, status, timings)
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        router = path.split("/")[1] if path.split("/")[1:2] and path.split("/")[1] in ROUTER_NAMES else "core"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            router=router, method=request.method, route=path, status=str(status)
+        )
+
+async def log_after_body(body_iterator, request: Request, status: int, timings):
+    """Pass the body through, then print one JSON timing line (streamed responses include their full duration)"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        route = request.scope.get("route")
+        print(json.dumps({
+            "event": "request_timing",
+            "method": request.method,
+            "route": route.path if route else request.url.path,
+            "status": status,
+            "duration_ms": round(timings.elapsed_ms(), 1),
+            "phases": timings.as_dict()
+        }))
+
 def success_response(data):
     return {"data": data, "error": None}
 
@@ -73,12 +574,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin JS can only read response headers listed here
+    expose_headers=["X-Assessment-Cache", "Server-Timing"],
 )
 
 @core_router.get("/")
 async def root():
     return success_response("Edu AI Backend Signal: Active")
 
+async def probe_supabase():
+    await supabase_execute(get_supabase().table("user_data").select("user_id").limit(1))
+
+async def probe_openai():
+    if not get_openai_client():
+        return "not_configured"
+    await get_openai_client().models.retrieve("gpt-4o-mini")
+
+async def probe_gemini():
+    if not get_gemini_client():
+        return "not_configured"
+    await get_gemini_client().aio.models.get(model="gemini-2.5-flash-lite")
+
+async def probe_gnews():
+    # Reachability only: an authenticated call would spend GNews daily quota
+    if not GNEWS_API_KEY or GNEWS_API_KEY == "YOUR_KEY":
+        return "not_configured"
+    response = await upstream_http.request("HEAD", f"{GNEWS_BASE_URL}/", upstream="gnews")
+    if response.status_code >= 500:
+        raise ValueError(f"HTTP {response.status_code}")
+
+health_prober = HealthProber({
+    "supabase": probe_supabase,
+    "openai": probe_openai,
+    "gemini": probe_gemini,
+    "gnews": probe_gnews
+}, interval=HEALTH_PROBE_INTERVAL_SECONDS, timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+
 @core_router.get("/health")
 async def health():
     status = {
@@ -87,51 +618,62 @@ async def health():
         "openai": "unknown"
     }
 
-    # Check Supabase
-    try:
-        supabase.table("user_data").select("count", count="exact").limit(1).execute()
-        status["supabase"] = "connected"
-    except Exception as e:
-        status["supabase"] = f"error: {str(e)}"
+    # Supabase, from the latest background probe
+    supabase_check = health_prober.results.get("supabase")
+    if supabase_check:
+        status["supabase"] = "connected" if supabase_check["status"] == "ok" else f"error: {supabase_check['error']}"
 
     # Check OpenAI
-    if openai_client:
+    if OPENAI_API_KEY:
         status["openai"] = "configured"
     else:
         status["openai"] = "missing_key"
 
+    status.update(health_prober.snapshot())
+    status["circuits"] = {name: breaker.snapshot() for name, breaker in breakers.items()}
+    status["openai_queues"] = {group: scheduler.snapshot() for group, scheduler in openai_schedulers.items()}
+    status["coalescing"] = {name: flight.snapshot() for name, flight in flights.items()}
     return success_response(status)
 
+@core_router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@core_router.get("/health/live")
+async def liveness():
+    return success_response({"status": "alive"})
+
+@core_router.get("/health/ready")
+async def readiness(request: Request):
+    not_ready = []
+    if not getattr(request.app.state, "started", False):
+        not_ready.append("startup")
+    not_ready += [name for name in HEALTH_READY_REQUIRES if health_prober.status(name) not in ("ok", "not_configured")]
+
+    if not_ready:
+        return JSONResponse(status_code=503, content={"data": {"status": "not_ready", "waiting_on": not_ready}, "error": None})
+    return success_response({"status": "ready"})
+
 TECH_FEEDS = [
     "https://techcrunch.com/feed/",
     "https://www.technologyreview.com/feed/",
     "https://www.wired.com/feed/"
 ]
 
-def fetch_rss():
-    articles = []
-    for feed in TECH_FEEDS:
-        try:
-            parsed = feedparser.parse(feed)
-            for entry in parsed.entries[:5]:
-                title = getattr(entry, 'title', 'No Title')
-                summary = getattr(entry, 'summary', '')
-                if not summary and hasattr(entry, 'description'):
-                    summary = entry.description
-
-                # Basic cleaning: remove HTML tags if any
-                import re
-                clean_summary = re.sub('<[^<]+?>', '', summary)
-
-                articles.append(f"{title} - {clean_summary[:200]}...")
-        except Exception as e:
-            print(f"Error parsing feed {feed}: {e}")
-    return articles
+feed_aggregator = FeedAggregator(
+    (TECH_FEEDS if RSS_DEFAULT_FEEDS else []) + RSS_EXTRA_FEEDS,
+    http=upstream_http,
+    refresh_interval=RSS_REFRESH_SECONDS,
+    max_concurrency=RSS_MAX_CONCURRENCY
+)
 
 @news_router.get("/rss")
 async def get_rss_feeds():
     try:
-        feeds = fetch_rss()
+        # Served from memory; only a request that beats the first background refresh waits for it
+        if feed_aggregator.last_refresh is None:
+            await feed_aggregator.refresh()
+        feeds = feed_aggregator.articles
         if feeds and len(feeds) > 0:
             return success_response(feeds)
     except Exception as e:
@@ -145,30 +687,59 @@ async def get_rss_feeds():
         "Open Source AI Models Challenge Proprietary Solutions - New open-source models are gaining traction...",
         "Web3 and AI Integration Trends Emerge - Decentralized AI systems are becoming more practical..."
     ]
+    FALLBACKS.inc(path="demo_rss")
     return success_response(demo_feeds)
 
 
-def fetch_tech_news(topic="technology"):
-    url = "https://gnews.io/api/v4/top-headlines"
+GNEWS_CATEGORIES = ["breaking-news", "world", "nation", "business", "technology", "entertainment", "sports", "science", "health"]
 
+def gnews_query(topic):
+    """Map a free-form topic onto a GNews category or keyword query"""
     clean_topic = topic.strip().lower() if topic else "technology"
-    categories = ["breaking-news", "world", "nation", "business", "technology", "entertainment", "sports", "science", "health"]
+    if clean_topic in GNEWS_CATEGORIES:
+        return {"topic": clean_topic}
+    return {"q": clean_topic}
+
+async def fetch_tech_news(topic="technology"):
+    query = gnews_query(topic)
+    return await flights["gnews"].do(tuple(sorted(query.items())), lambda: fetch_gnews(query))
+
+async def fetch_gnews(query):
+    url = f"{GNEWS_BASE_URL}/api/v4/top-headlines"
 
     params = {
         "lang": "en",
-        "apikey": GNEWS_API_KEY
+        "apikey": GNEWS_API_KEY,
+        **query
     }
 
-    if clean_topic in categories:
-        params["topic"] = clean_topic
-    else:
-        params["q"] = clean_topic
-
-    response = requests.get(url, params=params)
+    with phase("gnews"), breakers["gnews"].guard():
+        response = await upstream_http.get(url, params=params, upstream="gnews")
+        # Server errors and throttling count against the breaker; other non-200s just mean no articles
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
     if response.status_code != 200:
         return []
     return response.json().get("articles", [])
 
+# Empty results (quota errors, unknown topics) are not cached so the next request retries
+news_cache = TTLCache(
+    ttl=NEWS_CACHE_TTL_SECONDS,
+    stale_ttl=NEWS_CACHE_STALE_SECONDS,
+    max_entries=NEWS_CACHE_MAX_ENTRIES,
+    should_cache=bool
+)
+
+async def get_news_articles(topic="technology"):
+    """Cached GNews lookup shared by /news/ and the search_industry_news tool"""
+    key = tuple(sorted(gnews_query(topic).items()))
+    articles, _ = await news_cache.get_or_load(key, lambda: fetch_tech_news(topic))
+    return articles
+
+@news_router.get("/cache/stats")
+async def news_cache_stats():
+    return success_response({"gnews": news_cache.snapshot(), "rss": feed_aggregator.snapshot()})
+
 # Demo news data as fallback
 DEMO_NEWS = [
     {
@@ -198,55 +769,425 @@ DEMO_NEWS = [
 async def get_tech_news(topic: str = "technology"):
     try:
         if not GNEWS_API_KEY or GNEWS_API_KEY == "YOUR_KEY":
+            FALLBACKS.inc(path="demo_news")
             return success_response(DEMO_NEWS)
-        articles = fetch_tech_news(topic)
+        articles = await get_news_articles(topic)
         return success_response(articles)
     except Exception as e:
         print(f"GNews API error: {e}")
+        FALLBACKS.inc(path="demo_news")
         return success_response(DEMO_NEWS)
 
-def create_embedding(text):
-    if not openai_client:
+def embedding_options():
+    """model (and dimensions, for a shortened profile) for embeddings.create"""
+    if EMBEDDING_DIMENSIONS == EMBEDDING_NATIVE_DIMENSIONS:
+        return {"model": EMBEDDING_MODEL}
+    return {"model": EMBEDDING_MODEL, "dimensions": EMBEDDING_DIMENSIONS}
+
+async def create_embedding(text, priority="chat"):
+    """Query embedding; may come from a compact cache, so it is never the one stored in knowledge_base"""
+    if not get_openai_client():
         raise ValueError("OpenAI client not configured")
     if not text or not text.strip():
-        return [0.0] * 1536 # Return zero vector for empty text
+        return [0.0] * EMBEDDING_DIMENSIONS # Return zero vector for empty text
+
+    cached = embedding_cache.get(EMBEDDING_PROFILE, text)
+    if cached is not None:
+        return cached
+
+    async def embed():
+        with phase("embed"):
+            response = await openai_embed(
+                priority=priority,
+                input=text,
+                **embedding_options()
+            )
+        embedding = response.data[0].embedding
+        embedding_cache.put(EMBEDDING_PROFILE, text, embedding)
+        return embedding
+
+    # Keyed like the cache, so texts differing only in whitespace share the call
+    return await flights["embedding"].do(embedding_cache_key(EMBEDDING_PROFILE, text), embed)
+
+def plan_embedding_batches(texts):
+    """Group text indexes into sub-batches that respect the per-request token and item caps"""
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS or len(current) >= EMBEDDING_BATCH_MAX_ITEMS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def create_embeddings(texts):
+    """
+    Embed many texts with as few API requests as possible.
+    Returns one entry per input: the embedding, or the exception that sub-batch raised.
+    These vectors are written to knowledge_base, so a compact (lossy) cache is never read here;
+    only a float32 cache can answer, and fresh vectors still refresh the cache for queries.
+    """
+    results = [None] * len(texts)
+    use_cache = embedding_cache.storage == "float32"
+    # Unique uncached texts -> every input index that needs them
+    pending = {}
+    for i, text in enumerate(texts):
+        if text in pending:
+            pending[text].append(i)
+            continue
+        cached = embedding_cache.get(EMBEDDING_PROFILE, text) if use_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending[text] = [i]
+
+    unique = list(pending)
+
+    async def embed_batch(batch):
+        try:
+            response = await openai_embed(priority="ingestion", input=[unique[j] for j in batch], **embedding_options())
+            for item in response.data:
+                text = unique[batch[item.index]]
+                embedding_cache.put(EMBEDDING_PROFILE, text, item.embedding)
+                for i in pending[text]:
+                    results[i] = item.embedding
+        except Exception as e:
+            print(f"Embedding batch error: {e}")
+            for j in batch:
+                for i in pending[unique[j]]:
+                    results[i] = e
+
+    await asyncio.gather(*[embed_batch(batch) for batch in plan_embedding_batches(unique)])
+    return results
+
+@rag_router.get("/cache/stats")
+async def embedding_cache_stats():
+    return success_response(embedding_cache.snapshot())
+
+async def select_in(columns, column, values):
+    """knowledge_base rows whose column is in values, fetched in concurrent pages"""
+    pages = [values[i:i + INGEST_LOOKUP_PAGE_SIZE] for i in range(0, len(values), INGEST_LOOKUP_PAGE_SIZE)]
+    results = await asyncio.gather(*[
+        supabase_execute(get_supabase().table("knowledge_base").select(columns).in_(column, page))
+        for page in pages
+    ])
+    return [row for res in results for row in res.data]
+
+async def delete_in(column, values):
+    pages = [values[i:i + INGEST_LOOKUP_PAGE_SIZE] for i in range(0, len(values), INGEST_LOOKUP_PAGE_SIZE)]
+    await asyncio.gather(*[
+        supabase_execute(get_supabase().table("knowledge_base").delete().in_(column, page))
+        for page in pages
+    ])
+
+async def ingest_documents(documents, default_source):
+    """
+    Chunk documents and bring their stored chunks in line with the new content.
+    A document is keyed by its document_id (or, without one, by the hash of its content).
+    Chunks whose content hash is already stored for that document are kept without re-embedding,
+    new chunks are embedded and inserted, and chunks that disappeared are deleted afterwards,
+    so a document is never missing from search while it is being updated.
+    Returns one status item per input document.
+    """
+    items = [{"index": i, "status": "pending"} for i in range(len(documents))]
+    plans = {}
+    for i, doc in enumerate(documents):
+        content = doc.get("content") if isinstance(doc, dict) else None
+        if not isinstance(content, str) or not content.strip():
+            items[i].update(status="error", error="Content is required")
+            continue
+        document_id = str(doc.get("document_id") or f"sha256:{content_hash(content)}")
+        if document_id in plans:
+            items[i].update(status="error", error=f"Duplicate document_id {document_id} in batch")
+            continue
+        chunks = {}
+        for text in chunk_text(content, INGEST_CHUNK_TOKENS, INGEST_CHUNK_OVERLAP_TOKENS):
+            chunks.setdefault(content_hash(text), text)
+        plans[document_id] = {"index": i, "source": doc.get("source") or default_source, "chunks": chunks}
+
+    if not plans:
+        return items
+
+    # Chunks already stored for these documents: content hash -> row ids
+    stored = {document_id: {} for document_id in plans}
+    try:
+        existing = await select_in("id, document_id, content_hash", "document_id", list(plans))
+    except Exception as e:
+        print(f"Chunk lookup error: {e}")
+        for plan in plans.values():
+            items[plan["index"]].update(status="error", error=f"Lookup failed: {e}")
+        return items
+    for row in existing:
+        stored[row["document_id"]].setdefault(row["content_hash"], []).append(row["id"])
+
+    new_chunks, stale = [], {}
+    for document_id, plan in plans.items():
+        kept = stored[document_id]
+        plan["skipped"] = sum(1 for h in plan["chunks"] if h in kept)
+        new_chunks += [(document_id, h, text) for h, text in plan["chunks"].items() if h not in kept]
+        # Chunks no longer in the document, plus any duplicate copies of kept ones
+        stale[document_id] = [
+            row_id
+            for h, ids in kept.items()
+            for row_id in (ids if h not in plan["chunks"] else ids[1:])
+        ]
+
+    embeddings = await create_embeddings([text for _, _, text in new_chunks])
+
+    rows, failed = [], {}
+    for (document_id, h, text), embedding in zip(new_chunks, embeddings):
+        if isinstance(embedding, Exception):
+            failed.setdefault(document_id, f"Embedding failed: {embedding}")
+            continue
+        rows.append({
+            "content": text,
+            "embedding": embedding,
+            "source": plans[document_id]["source"],
+            "document_id": document_id,
+            "content_hash": h
+        })
+    # A partly embedded document is left as it was; its chunks are retried on the next run
+    rows = [r for r in rows if r["document_id"] not in failed]
+    for document_id, error in failed.items():
+        items[plans[document_id]["index"]].update(status="error", error=error)
 
-    return openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    ).data[0].embedding
+    inserted = []
+    if rows:
+        try:
+            result = await supabase_execute(get_supabase().table("knowledge_base").insert(rows))
+            inserted = [{**row, "embedding": r["embedding"]} for row, r in zip(result.data, rows)]
+        except Exception as e:
+            print(f"Bulk insert error: {e}")
+            for document_id in {r["document_id"] for r in rows}:
+                failed[document_id] = f"Insert failed: {e}"
+                items[plans[document_id]["index"]].update(status="error", error=f"Insert failed: {e}")
+
+    removed = [row_id for document_id, ids in stale.items() if document_id not in failed for row_id in ids]
+    if removed:
+        try:
+            await delete_in("id", removed)
+        except Exception as e:
+            # The new chunks are in place; leftovers are removed by the next sync of the document
+            print(f"Stale chunk delete error: {e}")
+            removed = []
+
+    if vector_index is not None:
+        vector_index.add(inserted)
+    if keyword_index is not None:
+        keyword_index.add(inserted)
+    remove_from_indexes(removed)
+    if semantic_cache is not None and (inserted or removed):
+        semantic_cache.purge()
+
+    embedded_by_document = {}
+    for row in inserted:
+        embedded_by_document[row["document_id"]] = embedded_by_document.get(row["document_id"], 0) + 1
+    removed_set = set(removed)
+    for document_id, plan in plans.items():
+        if document_id in failed:
+            continue
+        item = items[plan["index"]]
+        item.update(
+            status="ok",
+            document_id=document_id,
+            chunks=len(plan["chunks"]),
+            embedded=embedded_by_document.get(document_id, 0),
+            skipped=plan["skipped"],
+            deleted=sum(1 for row_id in stale[document_id] if row_id in removed_set)
+        )
+        INGEST_CHUNKS.inc(item["embedded"], outcome="embedded")
+        INGEST_CHUNKS.inc(item["skipped"], outcome="skipped")
+        INGEST_CHUNKS.inc(item["deleted"], outcome="deleted")
+    return items
+
+def summarize_ingest(items):
+    ok = [item for item in items if item["status"] == "ok"]
+    return {
+        "documents": len(ok),
+        "failed": len(items) - len(ok),
+        "chunks": sum(item["chunks"] for item in ok),
+        "embedded": sum(item["embedded"] for item in ok),
+        "skipped": sum(item["skipped"] for item in ok),
+        "deleted": sum(item["deleted"] for item in ok),
+    }
 
 @rag_router.post("/ingest")
 async def ingest_content(payload: dict):
     content = payload.get("content")
-    source = payload.get("source", "manual")
 
-    if not content:
+    if not isinstance(content, str) or not content.strip():
         return JSONResponse(status_code=400, content={"data": None, "error": "Content is required"})
 
-    embedding = create_embedding(content)
-    result = supabase.table("knowledge_base").insert({
-        "content": content,
-        "embedding": embedding,
-        "source": source
-    }).execute()
+    item = (await ingest_documents([payload], payload.get("source") or "manual"))[0]
+    if item["status"] != "ok":
+        return JSONResponse(status_code=500, content={"data": None, "error": item["error"]})
+    item.pop("index")
+    item.pop("status")
+    return success_response(item)
+
+@rag_router.post("/ingest/batch")
+async def ingest_content_batch(payload: dict):
+    documents = payload.get("documents")
+    default_source = payload.get("source", "manual")
+
+    if not isinstance(documents, list) or not documents:
+        return JSONResponse(status_code=400, content={"data": None, "error": "Documents are required"})
+    if len(documents) > INGEST_BATCH_MAX_DOCUMENTS:
+        return JSONResponse(status_code=400, content={"data": None, "error": f"At most {INGEST_BATCH_MAX_DOCUMENTS} documents per batch"})
+
+    items = await ingest_documents(documents, default_source)
+    return success_response({**summarize_ingest(items), "items": items})
+
+@rag_router.delete("/documents/{doc_id}")
+async def delete_content(doc_id: str):
+    await supabase_execute(get_supabase().table("knowledge_base").delete().eq("id", doc_id))
+    remove_from_indexes([doc_id])
+    if semantic_cache is not None:
+        semantic_cache.purge()
+    return success_response({"deleted": doc_id})
+
+@rag_router.get("/index/stats")
+async def vector_index_stats():
+    if vector_index is None:
+        return success_response({"enabled": False})
+    return success_response({"enabled": True, **vector_index.snapshot()})
+
+@rag_router.get("/index/keyword/stats")
+async def keyword_index_stats():
+    if keyword_index is None:
+        return success_response({"enabled": False})
+    return success_response({"enabled": True, **keyword_index.snapshot()})
+
+async def get_context(query_embedding, source=None, min_similarity=RAG_MIN_SIMILARITY, match_count=RAG_MATCH_COUNT,
+                      with_embeddings=False):
+    """
+    Nearest knowledge_base rows as {id, content, source, similarity}, best first.
+    with_embeddings adds each row's vector as "embedding".
+    """
+    if vector_index is not None and vector_index.ready:
+        # A full scan of a large index takes tens of milliseconds; keep it off the event loop
+        with phase("vector_index"):
+            return await run_blocking(vector_index.search, query_embedding, match_count, source=source,
+                                      min_similarity=min_similarity, with_embeddings=with_embeddings)
+
+    async def match():
+        with phase("match_knowledge"):
+            res = await supabase_execute(get_supabase().rpc("match_knowledge", {
+                "query_embedding": query_embedding,
+                "match_count": match_count,
+                "filter_source": source,
+                "min_similarity": min_similarity,
+                "ef_search": max(RAG_EF_SEARCH, match_count),
+                "include_embedding": with_embeddings
+            }))
+        for row in res.data:
+            if with_embeddings:
+                row["embedding"] = parse_embedding(row["embedding"])
+            else:
+                row.pop("embedding", None)
+        return res.data
+
+    key = (hashlib.sha1(array("f", query_embedding).tobytes()).hexdigest(), source, min_similarity, match_count, with_embeddings)
+    # Coalesced callers share the rows; give each its own copies
+    return [dict(row) for row in await flights["match_knowledge"].do(key, match)]
+
+async def attach_embeddings(rows):
+    """Fill in "embedding" for rows that lack one (keyword hits), from the local index or knowledge_base"""
+    missing = [str(r["id"]) for r in rows if r.get("embedding") is None]
+    if not missing:
+        return rows
+    if vector_index is not None and vector_index.ready:
+        found = vector_index.embeddings(missing)
+    else:
+        found = {str(r["id"]): parse_embedding(r["embedding"]) for r in await select_in("id, embedding", "id", missing)}
+    return [r if r.get("embedding") is not None else {**r, "embedding": found.get(str(r["id"]))} for r in rows]
+
+async def rerank_candidates(rows, match_count, token_budget=None):
+    """Diverse, de-duplicated top match_count of the candidate rows, packed into token_budget"""
+    with phase("rerank"):
+        rows = [r for r in await attach_embeddings(rows) if r.get("embedding") is not None]
+        # Fused rows rank by reciprocal-rank score, vector rows by similarity
+        relevance = [r["score"] if "score" in r else r.get("similarity") or 0.0 for r in rows]
+        return diversify(
+            rows,
+            match_count,
+            relevance=relevance,
+            mmr_lambda=RAG_MMR_LAMBDA,
+            duplicate_threshold=RAG_DUPLICATE_SIMILARITY,
+            token_budget=token_budget
+        )
 
-    return success_response({"id": result.data[0]["id"]})
+async def keyword_search(query: str, source=None, match_count=RAG_MATCH_COUNT):
+    with phase("keyword_index"):
+        return await run_blocking(keyword_index.search, query, match_count, source)
 
-def get_context(query_embedding):
-    res = supabase.rpc("match_knowledge", {
-        "query_embedding": query_embedding,
-        "match_count": 5
-    }).execute()
-    return [r["content"] for r in res.data]
+async def retrieve(query: str, mode: str = RAG_SEARCH_MODE, source=None, min_similarity=RAG_MIN_SIMILARITY,
+                   match_count=RAG_MATCH_COUNT, rerank_results=RAG_RERANK_ENABLED, token_budget=None):
+    """
+    Knowledge_base rows for a text query, best first.
+    vector: embedding similarity only; keyword: BM25 only (no embedding call);
+    hybrid: both engines concurrently, fused by reciprocal rank; auto: keyword when the query is
+    clearly lexical, hybrid otherwise. Keyword modes fall back to vector until the index is warm.
+    rerank_results over-fetches candidates and diversifies them (vector and hybrid modes);
+    token_budget caps the estimated tokens of the returned content.
+    """
+    keyword_ready = keyword_index is not None and keyword_index.ready
+    if mode == "auto":
+        mode = "keyword" if keyword_ready and is_lexical_query(query, keyword_index, min_idf=RAG_LEXICAL_MIN_IDF) else "hybrid"
+    if not keyword_ready:
+        mode = "vector"
+
+    if mode == "keyword":
+        # Re-ranking needs embeddings, which a lexical lookup is meant to avoid
+        rows = await keyword_search(query, source, match_count)
+        return pack_to_budget(rows, token_budget) if token_budget else rows
+
+    candidates = max(match_count, RAG_RERANK_CANDIDATES) if rerank_results else match_count
+
+    async def vector_search(count):
+        embedding = await create_embedding(query)
+        return await get_context(embedding, source=source, min_similarity=min_similarity, match_count=count,
+                                 with_embeddings=rerank_results)
+
+    if mode == "vector":
+        rows = await vector_search(candidates)
+    else:
+        per_engine = max(candidates, match_count * HYBRID_CANDIDATE_MULTIPLIER)
+        vector_rows, keyword_rows = await asyncio.gather(
+            vector_search(per_engine),
+            keyword_search(query, source, per_engine)
+        )
+        rows = reciprocal_rank_fusion({"vector": vector_rows, "keyword": keyword_rows}, k=RRF_K, limit=candidates)
+
+    if rerank_results:
+        return await rerank_candidates(rows, match_count, token_budget)
+    return pack_to_budget(rows, token_budget) if token_budget else rows
 
 @rag_router.get("/search")
-async def search_knowledge(query: str):
+async def search_knowledge(query: str, source: Optional[str] = None, min_similarity: Optional[float] = None,
+                           limit: int = RAG_MATCH_COUNT, mode: str = RAG_SEARCH_MODE,
+                           rerank: bool = RAG_RERANK_ENABLED, token_budget: Optional[int] = None):
     if not query:
         return JSONResponse(status_code=400, content={"data": None, "error": "Query is required"})
-    query_embedding = create_embedding(query)
-    context = get_context(query_embedding)
-    return success_response(context)
+    if not 1 <= limit <= 50:
+        return JSONResponse(status_code=400, content={"data": None, "error": "limit must be between 1 and 50"})
+    if mode not in RAG_SEARCH_MODES:
+        return JSONResponse(status_code=400, content={"data": None, "error": f"mode must be one of {', '.join(RAG_SEARCH_MODES)}"})
+    if token_budget is not None and token_budget < 1:
+        return JSONResponse(status_code=400, content={"data": None, "error": "token_budget must be positive"})
+    results = await retrieve(
+        query,
+        mode=mode,
+        source=source,
+        min_similarity=RAG_MIN_SIMILARITY if min_similarity is None else min_similarity,
+        match_count=limit,
+        rerank_results=rerank,
+        token_budget=token_budget
+    )
+    return success_response(results)
 
 SYSTEM_PROMPT = """
 You are the "Twin Agent" - a sophisticated digital career companion grounded in market reality.
@@ -289,6 +1230,15 @@ AVAILABLE_TOOLS = [
                     "query": {
                         "type": "string",
                         "description": "The search query to find relevant context."
+                    },
+                    "source": {
+                        "type": "string",
+                        "description": "Optional: only search documents ingested from this source."
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["vector", "keyword", "hybrid"],
+                        "description": "Optional: 'keyword' for exact names (tools, companies, course titles), 'vector' for conceptual questions, 'hybrid' (default) for both."
                     }
                 },
                 "required": ["query"]
@@ -314,34 +1264,68 @@ AVAILABLE_TOOLS = [
     }
 ]
 
-def execute_tool_call(tool_call):
-    """Execute the tool requested by the model"""
-    func_name = tool_call.function.name
-    args = json.loads(tool_call.function.arguments)
+TOOL_STATUS_MESSAGES = {
+    "search_knowledge_base": "Searching knowledge base…",
+    "search_industry_news": "Scanning industry news…"
+}
+
+async def execute_tool_call(tool_call):
+    """Execute the tool requested by the model (tool_call in OpenAI message format)"""
+    func_name = tool_call["function"]["name"]
+    args = json.loads(tool_call["function"]["arguments"])
 
     if func_name == "search_knowledge_base":
         query = args.get("query")
-        embedding = create_embedding(query)
-        context = get_context(embedding)
-        return json.dumps(context)
+        mode = args.get("mode") if args.get("mode") in RAG_SEARCH_MODES else RAG_SEARCH_MODE
+        context = await retrieve(query, mode=mode, source=args.get("source") or None, token_budget=RAG_CONTEXT_TOKEN_BUDGET)
+        # Scores let the model weigh weak matches against each other; keyword-only hits have no similarity
+        return json.dumps([
+            {
+                "content": r["content"],
+                "source": r.get("source"),
+                "similarity": round(r["similarity"], 3) if r.get("similarity") is not None else None
+            }
+            for r in context
+        ])
 
     elif func_name == "search_industry_news":
         topic = args.get("topic")
-        articles = fetch_tech_news(topic)
+        articles = await get_news_articles(topic)
         # Summarize articles to save tokens
         summary = [f"{a['title']} - {a['description']}" for a in articles[:3]]
         return json.dumps(summary)
 
     return "Error: Function not found"
 
+async def run_tool_call(tool_call):
+    try:
+        with phase(f"tool_{tool_call['function']['name']}"):
+            tool_output = await asyncio.wait_for(execute_tool_call(tool_call), timeout=TOOL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"Tool execution timed out: {tool_call['function']['name']}")
+        tool_output = "Error: tool timed out."
+    except Exception as e:
+        print(f"Tool execution error: {e}")
+        tool_output = "Error executing tool."
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": tool_call["function"]["name"],
+        "content": tool_output
+    }
+
+async def run_tool_calls(tool_calls):
+    """Execute tool calls concurrently and return the tool messages in call order"""
+    return list(await asyncio.gather(*[run_tool_call(tool_call) for tool_call in tool_calls]))
+
 async def run_agent(query: str):
     """
     Run the Agentic RAG loop:
     1. Plan/Think
-    2. Call Tools (if needed)
+    2. Call Tools (if needed, up to AGENT_MAX_TOOL_ROUNDS rounds)
     3. Generate Final Answer
     """
-    if not openai_client:
+    if not get_openai_client():
         return "AI Client unavailable."
 
     messages = [
@@ -349,46 +1333,181 @@ async def run_agent(query: str):
         {"role": "user", "content": query}
     ]
 
-    # First Turn: Let the model decide to use tools or answer directly
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        tools=AVAILABLE_TOOLS,
-        tool_choice="auto"
-    )
+    for depth in range(AGENT_MAX_TOOL_ROUNDS + 1):
+        # Let the model decide to use tools or answer directly; the last turn must answer
+        request = {"model": "gpt-4o-mini", "messages": messages}
+        if depth < AGENT_MAX_TOOL_ROUNDS:
+            request.update(tools=AVAILABLE_TOOLS, tool_choice="auto")
+        with phase(f"llm_turn{depth + 1}"):
+            response = await openai_chat(**request)
+
+        response_message = response.choices[0].message
+        if not response_message.tool_calls:
+            return response_message.content
+
+        messages.append(response_message)
+        tool_calls = [tool_call.model_dump() for tool_call in response_message.tool_calls]
+        messages.extend(await run_tool_calls(tool_calls))
 
-    response_message = response.choices[0].message
-    messages.append(response_message)
+# ============= STREAMING CHAT =============
 
-    # Check if the model wants to call tools
-    if response_message.tool_calls:
-        for tool_call in response_message.tool_calls:
-            # Execute tool
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_agent(query: str):
+    """
+    Streaming variant of run_agent. Yields (event, data) pairs:
+    status events for each phase, token events for answer text.
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": query}
+    ]
+    yield "status", {"phase": "thinking", "message": "Analyzing trajectory…"}
+
+    for depth in range(AGENT_MAX_TOOL_ROUNDS + 1):
+        request = {"model": "gpt-4o-mini", "messages": messages}
+        if depth < AGENT_MAX_TOOL_ROUNDS:
+            request.update(tools=AVAILABLE_TOOLS, tool_choice="auto")
+        if depth > 0:
+            yield "status", {"phase": "answer", "message": "Synthesizing answer…"}
+
+        # Stream a direct answer, or assemble tool calls from the deltas
+        content, tool_calls = [], {}
+        async for chunk in openai_chat_stream(**request):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                yield "token", {"text": delta.content}
+            for fragment in delta.tool_calls or []:
+                call = tool_calls.setdefault(fragment.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    call["function"]["name"] += fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    call["function"]["arguments"] += fragment.function.arguments
+
+        if not tool_calls:
+            return
+
+        calls = [tool_calls[i] for i in sorted(tool_calls)]
+        messages.append({"role": "assistant", "content": "".join(content) or None, "tool_calls": calls})
+        for call in calls:
+            name = call["function"]["name"]
+            yield "status", {"phase": "tool", "tool": name, "message": TOOL_STATUS_MESSAGES.get(name, "Running tool…")}
+        messages.extend(await run_tool_calls(calls))
+
+async def stream_openai_direct(query: str):
+    async for chunk in openai_chat_stream(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ]
+    ):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield "token", {"text": chunk.choices[0].delta.content}
+
+async def stream_gemini(query: str):
+    async for chunk in gemini_generate_stream(
+        model="gemini-2.5-flash-lite",
+        contents=f"{SYSTEM_PROMPT}\n\nUser: {query}"
+    ):
+        if chunk.text:
+            yield "token", {"text": chunk.text}
+
+async def semantic_lookup(query: str):
+    """Return (query_embedding, cached_entry); both are None when the cache is off or embedding fails"""
+    if semantic_cache is None:
+        return None, None
+    try:
+        query_embedding = await create_embedding(query)
+    except Exception as e:
+        print(f"Semantic cache lookup error: {e}")
+        return None, None
+    with phase("semantic_cache"):
+        return query_embedding, await run_blocking(semantic_cache.lookup, query_embedding)
+
+@chat_router.get("/cache/stats")
+async def semantic_cache_stats():
+    if semantic_cache is None:
+        return success_response({"enabled": False})
+    return success_response({"enabled": True, **semantic_cache.snapshot()})
+
+@chat_router.post("/cache/purge")
+async def purge_semantic_cache():
+    if semantic_cache is not None:
+        semantic_cache.purge()
+    return success_response({"purged": semantic_cache is not None})
+
+@chat_router.post("/ask/stream")
+async def ask_ai_stream(payload: dict):
+    query = payload.get("query")
+    if not query:
+        return JSONResponse(status_code=400, content={"data": None, "error": "Query is required"})
+
+    # Same fallback chain as /chat/ask: agent -> direct OpenAI -> Gemini
+    providers = []
+    if get_openai_client():
+        providers += [("agent", stream_agent, "openai_chat"), ("openai", stream_openai_direct, "openai_chat")]
+    if get_gemini_client():
+        providers.append(("gemini", stream_gemini, "gemini"))
+
+    async def events():
+        query_embedding, cached = await semantic_lookup(query)
+        if cached:
+            yield sse_event("token", {"text": cached["answer"]})
+            yield sse_event("done", {"answer": cached["answer"], "provider": "cache"})
+            return
+
+        for provider, stream, upstream in providers:
+            # Skip providers whose circuit is open instead of waiting for them to fail
+            if not breakers[upstream].available():
+                continue
+            parts = []
             try:
-                tool_output = execute_tool_call(tool_call)
-                messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": tool_call.function.name,
-                    "content": tool_output
-                })
+                async for event, data in stream(query):
+                    if event == "token":
+                        parts.append(data["text"])
+                    yield sse_event(event, data)
+                answer = "".join(parts)
+                # Only grounded agent answers are reused
+                if provider == "agent" and answer and query_embedding is not None:
+                    semantic_cache.store(query, query_embedding, answer)
+                if provider != "agent":
+                    FALLBACKS.inc(path="gemini" if provider == "gemini" else "openai_direct")
+                yield sse_event("done", {"answer": answer, "provider": provider})
+                return
             except Exception as e:
-                print(f"Tool execution error: {e}")
-                messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": tool_call.function.name,
-                    "content": "Error executing tool."
-                })
-
-        # Second Turn: Generate final response with tool outputs
-        final_response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages
-        )
-        return final_response.choices[0].message.content
+                print(f"Stream error ({provider}): {e}")
+                # Tell the client to discard partial text before the next provider starts
+                if parts:
+                    yield sse_event("reset", {"reason": f"{provider} failed mid-stream"})
+
+        answer = "I'm having trouble connecting to my brain. Please try again."
+        FALLBACKS.inc(path="canned_answer")
+        yield sse_event("token", {"text": answer})
+        yield sse_event("done", {"answer": answer, "provider": None})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    return response_message.content
+async def gemini_answer(query: str):
+    response = await gemini_generate(
+        model="gemini-2.5-flash-lite",
+        contents=f"{SYSTEM_PROMPT}\n\nUser: {query}"
+    )
+    return response.text
+
+@chat_router.get("/hedge/stats")
+async def chat_hedge_stats():
+    return success_response(chat_hedger.snapshot())
 
 @chat_router.post("/ask")
 async def ask_ai(payload: dict):
@@ -396,41 +1515,52 @@ async def ask_ai(payload: dict):
     if not query:
         return JSONResponse(status_code=400, content={"data": None, "error": "Query is required"})
 
-    try:
-        # Use Agentic RAG
-        answer = await run_agent(query)
-        return success_response({"answer": answer})
-    except Exception as e:
-        print(f"Agent error: {e}")
-        traceback.print_exc()
-
-        # Fallback to simple direct answer (OpenAI)
-        if openai_client:
-             try:
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": query}
-                    ]
-                )
-                return success_response({"answer": response.choices[0].message.content})
-             except Exception as e:
-                 print(f"OpenAI fallback error: {e}")
+    budget = latency_budget(payload.get("latency_budget_ms"), CHAT_LATENCY_BUDGET_SECONDS)
+    deadline = time.monotonic() + budget
 
-        # Super Fallback: Use Gemini (if available)
-        if gemini_client:
-            try:
-                print("Using Gemini fallback...")
-                response = gemini_client.models.generate_content(
-                    model="gemini-2.5-flash-lite",
-                    contents=f"{SYSTEM_PROMPT}\n\nUser: {query}"
-                )
-                return success_response({"answer": response.text})
-            except Exception as e:
-                print(f"Gemini error: {e}")
+    query_embedding, cached = await semantic_lookup(query)
+    if cached:
+        return success_response({"answer": cached["answer"], "cached": True})
+
+    # Agentic RAG (OpenAI) hedged to Gemini; paths whose circuit is open are skipped outright
+    candidates = []
+    if get_openai_client() and breakers["openai_chat"].available():
+        candidates.append(("agent", lambda: run_agent(query)))
+    if get_gemini_client() and breakers["gemini"].available():
+        candidates.append(("gemini", lambda: gemini_answer(query)))
+
+    if candidates:
+        try:
+            answer, provider = await chat_hedger.run(*candidates, budget=max(0.1, deadline - time.monotonic()))
+            if provider == "agent":
+                if answer and query_embedding is not None:
+                    semantic_cache.store(query, query_embedding, answer)
+            else:
+                FALLBACKS.inc(path="gemini")
+            return success_response({"answer": answer})
+        except Exception as e:
+            print(f"Chat error: {e}")
+            if not isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+                traceback.print_exc()
+
+    # Fallback to simple direct answer (OpenAI), within whatever budget is left
+    remaining = deadline - time.monotonic()
+    if remaining > 0 and get_openai_client() and breakers["openai_chat"].available():
+        try:
+            response = await asyncio.wait_for(openai_chat(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": query}
+                ]
+            ), timeout=remaining)
+            FALLBACKS.inc(path="openai_direct")
+            return success_response({"answer": response.choices[0].message.content})
+        except Exception as e:
+            print(f"OpenAI fallback error: {e}")
 
-        return success_response({"answer": "I'm having trouble connecting to my brain. Please try again."})
+    FALLBACKS.inc(path="canned_answer")
+    return success_response({"answer": "I'm having trouble connecting to my brain. Please try again."})
 
 # ============= ASSESSMENT ENDPOINTS =============
 class ProfileData(BaseModel):
@@ -497,35 +1627,51 @@ MOCK_ASSESSMENT = {
     }
 }
 
-@assessment_router.post("/analyze")
-async def assess_career_profile(profile: ProfileData):
-    try:
-        profile_dict = profile.dict()
+assessment_cache = TTLCache(ttl=ASSESSMENT_CACHE_TTL_SECONDS, max_entries=ASSESSMENT_CACHE_MAX_ENTRIES)
 
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        system_prompt = f"""You are a career assessment AI. Analyze the user's profile and provide a structured assessment.
+def canonical_profile(value):
+    """Normalize a profile so cosmetic differences (key order, whitespace, 3.0 vs 3) hash the same"""
+    if isinstance(value, dict):
+        return {str(k): canonical_profile(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [canonical_profile(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def assessment_cache_key(profile_dict, current_date):
+    canonical = json.dumps(canonical_profile(profile_dict), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{ASSESSMENT_PROMPT_VERSION}|{current_date}|{canonical}".encode("utf-8")).hexdigest()
+
+def assessment_system_prompt(current_date):
+    return f"""You are a career assessment AI. Analyze the user's profile and provide a structured assessment.
 
 Current Date: {current_date}
 
 Return ONLY valid JSON matching this schema:
-{
-  "identified_gaps": [{"title": "string", "severity": "CRITICAL|MODERATE|LOW", "quantification": "string", "impact": "string"}],
-  "next_priority_actions": [{"order": 1, "action": "string", "impact": "HIGH|MEDIUM|LOW", "timeline": "string"}],
-  "learning_roadmap": [{"id": "string", "type": "VIDEO|COURSE|QUIZ|PRACTICE", "title": "string", "topic": "string", "provider": "string", "duration": "string", "description": "string", "url": "string", "scheduledDate": "2026-02-15"}],
+{{
+  "identified_gaps": [{{"title": "string", "severity": "CRITICAL|MODERATE|LOW", "quantification": "string", "impact": "string"}}],
+  "next_priority_actions": [{{"order": 1, "action": "string", "impact": "HIGH|MEDIUM|LOW", "timeline": "string"}}],
+  "learning_roadmap": [{{"id": "string", "type": "VIDEO|COURSE|QUIZ|PRACTICE", "title": "string", "topic": "string", "provider": "string", "duration": "string", "description": "string", "url": "string", "scheduledDate": "2026-02-15"}}],
   "career_risk_assessment": "string",
   "level": "BEGINNER|INTERMEDIATE|ADVANCED",
   "skillDepthScore": 0.75,
   "consistencyScore": 0.82,
   "practicalReadinessScore": 0.68,
-  "market_intel": {"salary_range": "$80k-$120k", "demand_level": "HIGH", "top_3_trending_skills": ["string"], "market_sentiment": "string"}
-}
+  "market_intel": {{"salary_range": "$80k-$120k", "demand_level": "HIGH", "top_3_trending_skills": ["string"], "market_sentiment": "string"}}
+}}
 
 Provide exactly 6 learning roadmap items with real URLs. Keep descriptions under 150 characters."""
 
-        response = openai_client.chat.completions.create(
+async def generate_assessment_openai(profile_dict, current_date):
+    with phase("assessment_llm"):
+        response = await openai_chat(
+            priority="assessment",
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": assessment_system_prompt(current_date)},
                 {"role": "user", "content": f"Analyze this career profile and return JSON: {json.dumps(profile_dict)}"}
             ],
             temperature=0.7,
@@ -533,12 +1679,69 @@ Provide exactly 6 learning roadmap items with real URLs. Keep descriptions under
             response_format={"type": "json_object"}
         )
 
-        result = json.loads(response.choices[0].message.content)
+    return json.loads(response.choices[0].message.content)
+
+async def generate_assessment_gemini(profile_dict, current_date):
+    with phase("assessment_gemini"):
+        response = await gemini_generate(
+            model="gemini-2.5-flash-lite",
+            contents=f"{assessment_system_prompt(current_date)}\n\nAnalyze this career profile and return JSON: {json.dumps(profile_dict)}",
+            config={"response_mime_type": "application/json", "temperature": 0.7, "max_output_tokens": 2000}
+        )
+    return json.loads(response.text)
+
+async def generate_assessment(profile_dict, current_date, budget=None):
+    """OpenAI first, hedged to Gemini after ASSESSMENT_HEDGE_DELAY_SECONDS; skips providers with open circuits"""
+    candidates = []
+    if get_openai_client() and breakers["openai_chat"].available():
+        candidates.append(("openai", lambda: generate_assessment_openai(profile_dict, current_date)))
+    if get_gemini_client() and breakers["gemini"].available():
+        candidates.append(("gemini", lambda: generate_assessment_gemini(profile_dict, current_date)))
+    if not candidates:
+        raise ValueError("No assessment provider available")
+
+    result, provider = await assessment_hedger.run(*candidates, budget=budget)
+    if provider == "gemini":
+        FALLBACKS.inc(path="gemini_assessment")
+    return result
+
+@assessment_router.get("/hedge/stats")
+async def assessment_hedge_stats():
+    return success_response(assessment_hedger.snapshot())
+
+@assessment_router.post("/analyze")
+async def assess_career_profile(profile: ProfileData, http_response: Response, bypass_cache: bool = False,
+                                latency_budget_ms: Optional[int] = None):
+    try:
+        profile_dict = profile.dict()
+
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        cache_key = assessment_cache_key(profile_dict, current_date)
+        budget = latency_budget(latency_budget_ms, ASSESSMENT_LATENCY_BUDGET_SECONDS)
+
+        def load():
+            # Followers share the leader's hedged call and so its deadline; only coalesce equal budgets
+            return flights["assessment"].do((cache_key, budget), lambda: generate_assessment(profile_dict, current_date, budget))
+
+        if bypass_cache:
+            result = await load()
+            assessment_cache.put(cache_key, result)
+            http_response.headers["X-Assessment-Cache"] = "bypass"
+        else:
+            result, state = await assessment_cache.get_or_load(cache_key, load)
+            http_response.headers["X-Assessment-Cache"] = "hit" if state == "fresh" else "miss"
+
         return success_response(result)
     except Exception as e:
         print(f"Assessment error: {e}")
+        http_response.headers["X-Assessment-Cache"] = "fallback"
+        FALLBACKS.inc(path="mock_assessment")
         return success_response(MOCK_ASSESSMENT)
 
+@assessment_router.get("/cache/stats")
+async def assessment_cache_stats():
+    return success_response(assessment_cache.snapshot())
+
 # ============= OPPORTUNITIES ENDPOINTS =============
 @opportunities_router.post("/fetch")
 async def fetch_opportunities(payload: dict):
@@ -583,7 +1786,8 @@ Return a JSON array of opportunities with this structure:
 
 Find 5-8 diverse opportunities. Use Google Search to find real links."""
 
-        response = openai_client.chat.completions.create(
+        response = await openai_chat(
+            priority="opportunities",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a career opportunities finder. Return ONLY valid JSON."},
@@ -665,6 +1869,7 @@ Find 5-8 diverse opportunities. Use Google Search to find real links."""
                 "matchScore": 88
             }
         ]
+        FALLBACKS.inc(path="demo_opportunities")
         return success_response(demo_opportunities)
         return JSONResponse(status_code=500, content={"data": None, "error": str(e)})
 
@@ -678,11 +1883,11 @@ async def save_profile(payload: dict):
         if not profile:
             return JSONResponse(status_code=400, content={"data": None, "error": "Profile is required"})
 
-        result = supabase.table("user_data").upsert({
+        result = await supabase_execute(get_supabase().table("user_data").upsert({
             "user_id": DEMO_USER_ID,
             "profile": profile,
             "updated_at": "now()"
-        }, on_conflict="user_id").execute()
+        }, on_conflict="user_id"))
 
         return success_response({"saved": True})
     except Exception as e:
@@ -695,11 +1900,11 @@ async def save_assessment(payload: dict):
         if not assessment:
             return JSONResponse(status_code=400, content={"data": None, "error": "Assessment is required"})
 
-        result = supabase.table("user_data").upsert({
+        result = await supabase_execute(get_supabase().table("user_data").upsert({
             "user_id": DEMO_USER_ID,
             "assessment": assessment,
             "updated_at": "now()"
-        }, on_conflict="user_id").execute()
+        }, on_conflict="user_id"))
 
         return success_response({"saved": True})
     except Exception as e:
@@ -708,7 +1913,7 @@ async def save_assessment(payload: dict):
 @profile_router.get("/data")
 async def get_user_data():
     try:
-        result = supabase.table("user_data").select("profile, assessment").eq("user_id", DEMO_USER_ID).single().execute()
+        result = await supabase_execute(get_supabase().table("user_data").select("profile, assessment").eq("user_id", DEMO_USER_ID).single())
 
         if not result.data:
             return success_response({"profile": None, "assessment": None})
@@ -730,4 +1935,20 @@ app.include_router(rag_router)
 app.include_router(core_router)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Edu AI Career Growth Agent API")
+    parser.add_argument("--startup-report", action="store_true", help="print cold-start import and client timings as JSON, then exit")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list in the startup report")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from startup_report import build_report
+        report = build_report("main", {
+            "supabase": get_supabase,
+            "openai": get_openai_client,
+            "gemini": get_gemini_client
+        }, top=args.top)
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
@@ -0,0 +1,255 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans cache hits (sub-millisecond) through slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: List[Callable[[], Dict[Tuple[str, ...], float]]] = []
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Register a callback returning {label_values_tuple: value}, evaluated at scrape time"""
+        self._callbacks.append(callback)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for callback in self._callbacks:
+            try:
+                values.update(callback())
+            except Exception as e:
+                print(f"Gauge callback error ({self.name}): {e}")
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, edge in enumerate(self.buckets):
+                if value <= edge:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for edge, count in zip(self.buckets, series):
+                cumulative += count
+                le = "+Inf" if math.isinf(edge) else _format_value(edge)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', le))} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "eduai_http_request_duration_seconds",
+    "Time to response headers for API requests",
+    ["router", "method", "route", "status"]
+))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "eduai_upstream_request_duration_seconds",
+    "Latency of calls to upstream services",
+    ["upstream"]
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "eduai_upstream_errors_total",
+    "Failed calls to upstream services",
+    ["upstream"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "eduai_llm_tokens_total",
+    "Tokens reported by completion and embedding responses",
+    ["provider", "model", "kind"]
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "eduai_fallback_total",
+    "Responses served from a fallback path",
+    ["path"]
+))
+HEDGE_EVENTS = REGISTRY.register(Counter(
+    "eduai_hedge_events_total",
+    "Hedged request outcomes (hedged, failover, win_<provider>, failed, deadline_exceeded)",
+    ["endpoint", "event"]
+))
+OPENAI_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "eduai_openai_queue_depth",
+    "OpenAI calls waiting for rate-limit admission",
+    ["group", "priority"]
+))
+OPENAI_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "eduai_openai_queue_wait_seconds",
+    "Time OpenAI calls spent queued for rate-limit admission",
+    ["group", "priority"]
+))
+OPENAI_RATE_LIMITED = REGISTRY.register(Counter(
+    "eduai_openai_rate_limited_total",
+    "429 responses from OpenAI",
+    ["group"]
+))
+SINGLE_FLIGHT_CALLS = REGISTRY.register(Counter(
+    "eduai_single_flight_calls_total",
+    "Calls through single-flight coalescing (followers shared a leader's in-flight request)",
+    ["call", "role"]
+))
+INGEST_CHUNKS = REGISTRY.register(Counter(
+    "eduai_ingest_chunks_total",
+    "Knowledge base chunks processed by ingestion (embedded, skipped as unchanged, deleted as stale)",
+    ["outcome"]
+))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "eduai_circuit_state",
+    "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["upstream"]
+))
+
+
+@contextmanager
+def track_upstream(upstream: str):
+    """Time an upstream call and count it as an error if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream=upstream)
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream=upstream)
+
+
+def record_openai_usage(model: str, usage):
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, provider="openai", model=model, kind="prompt")
+    # Embedding responses carry no completion_tokens
+    if getattr(usage, "completion_tokens", None) is not None:
+        LLM_TOKENS.inc(usage.completion_tokens, provider="openai", model=model, kind="completion")
+
+
+def record_gemini_usage(model: str, usage_metadata):
+    if usage_metadata is None:
+        return
+    LLM_TOKENS.inc(getattr(usage_metadata, "prompt_token_count", 0) or 0, provider="gemini", model=model, kind="prompt")
+    LLM_TOKENS.inc(getattr(usage_metadata, "candidates_token_count", 0) or 0, provider="gemini", model=model, kind="completion")
@@ -0,0 +1,70 @@
+-- Migration: ANN index and filtered, thresholded match_knowledge
+-- For databases created from an earlier schema.sql. Fresh installs get the same objects from schema.sql.
+--
+-- Run each statement separately (e.g. psql -f, or one at a time in the Supabase SQL editor):
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+
+-- Building HNSW over a large table is memory hungry; give this session more room
+set maintenance_work_mem = '2GB';
+
+-- Approximate nearest-neighbour index (cosine distance, matches the <=> operator used below).
+-- m / ef_construction trade build time and memory for recall.
+create index concurrently if not exists knowledge_base_embedding_hnsw
+on knowledge_base using hnsw (embedding vector_cosine_ops)
+with (m = 16, ef_construction = 64);
+
+create index concurrently if not exists knowledge_base_source_idx on knowledge_base (source);
+
+-- The old two-argument signature would otherwise remain as an ambiguous overload
+drop function if exists match_knowledge(vector, int);
+
+create or replace function match_knowledge (
+  query_embedding vector(1536),
+  match_count int DEFAULT 5,
+  filter_source text DEFAULT null,
+  min_similarity float DEFAULT null,
+  ef_search int DEFAULT 40
+) returns table (
+  id uuid,
+  content text,
+  source text,
+  similarity float
+)
+language plpgsql
+as $$
+begin
+  perform set_config('hnsw.ef_search', greatest(ef_search, match_count)::text, true);
+  -- pgvector >= 0.8: keep walking the graph until enough rows pass the source filter
+  begin
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  exception when others then
+    null;
+  end;
+
+  return query
+  with candidates as materialized (
+    select
+      kb.id,
+      kb.content,
+      kb.source,
+      kb.embedding <=> query_embedding as distance
+    from knowledge_base kb
+    where filter_source is null or kb.source = filter_source
+    order by kb.embedding <=> query_embedding
+    limit match_count
+  )
+  select
+    c.id,
+    c.content,
+    c.source,
+    1 - c.distance as similarity
+  from candidates c
+  where min_similarity is null or 1 - c.distance >= min_similarity
+  order by c.distance;
+end;
+$$;
+
+analyze knowledge_base;
+
+-- Check the plan uses the index (expect "Index Scan using knowledge_base_embedding_hnsw"):
+-- explain analyze select id from knowledge_base order by embedding <=> (select embedding from knowledge_base limit 1) limit 5;
@@ -0,0 +1,14 @@
+-- Migration: chunk bookkeeping for incremental ingestion
+-- For databases created from an earlier schema.sql. Fresh installs get the same objects from schema.sql.
+--
+-- Run each statement separately: CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+
+alter table knowledge_base add column if not exists document_id text;
+alter table knowledge_base add column if not exists content_hash text;
+
+create index concurrently if not exists knowledge_base_document_idx on knowledge_base (document_id, content_hash);
+
+-- Rows ingested before chunking have no document_id. They are never matched or deleted by
+-- re-ingestion, so re-running ingest_data.py would store a second, chunked copy of them.
+-- Once the corpus has been re-ingested, remove the legacy copies:
+-- delete from knowledge_base where document_id is null;
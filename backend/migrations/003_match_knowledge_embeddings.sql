@@ -0,0 +1,55 @@
+-- Migration: match_knowledge can return candidate embeddings
+-- For databases created from an earlier schema.sql. Fresh installs get the same function from schema.sql.
+-- The return type changes, so the previous signature has to be dropped first.
+
+drop function if exists match_knowledge(vector, int, text, float, int);
+
+create or replace function match_knowledge (
+  query_embedding vector(1536),
+  match_count int DEFAULT 5,
+  filter_source text DEFAULT null,
+  min_similarity float DEFAULT null,
+  ef_search int DEFAULT 40,
+  include_embedding boolean DEFAULT false
+) returns table (
+  id uuid,
+  content text,
+  source text,
+  similarity float,
+  embedding vector(1536)
+)
+language plpgsql
+as $$
+begin
+  perform set_config('hnsw.ef_search', greatest(ef_search, match_count)::text, true);
+  -- pgvector >= 0.8: keep walking the graph until enough rows pass the source filter
+  begin
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  exception when others then
+    null;
+  end;
+
+  return query
+  with candidates as materialized (
+    select
+      kb.id,
+      kb.content,
+      kb.source,
+      kb.embedding,
+      kb.embedding <=> query_embedding as distance
+    from knowledge_base kb
+    where filter_source is null or kb.source = filter_source
+    order by kb.embedding <=> query_embedding
+    limit match_count
+  )
+  select
+    c.id,
+    c.content,
+    c.source,
+    1 - c.distance as similarity,
+    case when include_embedding then c.embedding end
+  from candidates c
+  where min_similarity is null or 1 - c.distance >= min_similarity
+  order by c.distance;
+end;
+$$;
@@ -0,0 +1,6 @@
+-- Migration: staging column for changing the embedding profile (EMBEDDING_DIMENSIONS)
+-- Only needed while re-embedding: `python reembed.py backfill --dimensions N` fills it, and the SQL from
+-- `python reembed.py swap-sql --dimensions N` moves it into embedding and drops it again.
+-- The column is unconstrained so it can hold any vector size.
+
+alter table knowledge_base add column if not exists embedding_next vector;
@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current: ContextVar[Optional["PhaseTimings"]] = ContextVar("phase_timings", default=None)
+
+
+class PhaseTimings:
+    """Per-request accumulator of named phase durations (milliseconds, summed per name)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, name: str, duration_ms: float):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += duration_ms
+        entry[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value; repeated phases note their call count"""
+        parts = []
+        for name, (total, count) in self.phases.items():
+            part = f"{name};dur={total:.1f}"
+            if count > 1:
+                part += f';desc="x{count}"'
+            parts.append(part)
+        parts.append(f"app;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {name: {"ms": round(total, 1), "count": count} for name, (total, count) in self.phases.items()}
+
+
+def start_request() -> PhaseTimings:
+    timings = PhaseTimings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block against the current request; a no-op outside a request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,51 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Bytes per component: float32 4, float16 2, int8 1 (+ one float32 scale per vector)
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def check_storage(storage: str) -> str:
+    if storage not in STORAGE_DTYPES:
+        raise ValueError(f"Unknown vector storage {storage!r} (expected one of {', '.join(STORAGE_DTYPES)})")
+    return storage
+
+
+def quantize(vectors: np.ndarray, storage: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode float32 rows for compact storage. int8 uses one symmetric scale per row
+    (largest component maps to 127); the other types return no scales.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if check_storage(storage) != "int8":
+        return vectors.astype(STORAGE_DTYPES[storage]), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[..., None]
+    return vectors
+
+
+def encode_vector(vector, storage: str) -> bytes:
+    """One vector as bytes (int8 blobs start with their float32 scale)"""
+    codes, scales = quantize(np.asarray(vector, dtype=np.float32)[None, :], storage)
+    prefix = scales.tobytes() if scales is not None else b""
+    return prefix + codes.tobytes()
+
+
+def decode_vector(blob: bytes, storage: str) -> np.ndarray:
+    if check_storage(storage) == "int8":
+        scale = np.frombuffer(blob[:4], dtype=np.float32)
+        return dequantize(np.frombuffer(blob[4:], dtype=np.int8)[None, :], scale)[0]
+    return np.frombuffer(blob, dtype=STORAGE_DTYPES[storage]).astype(np.float32)
+
+
+def bytes_per_vector(dim: int, storage: str) -> int:
+    return dim * np.dtype(STORAGE_DTYPES[check_storage(storage)]).itemsize + (4 if storage == "int8" else 0)
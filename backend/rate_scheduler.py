@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Lower value is served first
+PRIORITIES = {"chat": 0, "assessment": 1, "opportunities": 2, "ingestion": 3}
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) after the real cost is known; may go below zero"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def retry_after_seconds(headers, default: float = 1.0) -> float:
+    """Parse retry-after-ms / retry-after (seconds or HTTP date) from a 429 response"""
+    if headers is None:
+        return default
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+class RateLimitScheduler:
+    """
+    Admission control for one rate-limited API (e.g. OpenAI chat completions).
+    Callers wait in a priority queue (FIFO within a priority) until both the requests-per-minute
+    and tokens-per-minute buckets can cover them; a 429 pauses all dispatch for its Retry-After.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float, observe_wait: Optional[Callable[[str, float], None]] = None):
+        self.name = name
+        self.rpm = TokenBucket(rpm) if rpm > 0 else None
+        self.tpm = TokenBucket(tpm) if tpm > 0 else None
+        # Called with (priority, seconds waited) for every admitted call (metrics hook)
+        self.observe_wait = observe_wait
+        self.paused_until = 0.0
+        self._queue: List[list] = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.stats = {"admitted": 0, "rate_limited": 0, "wait_seconds_total": 0.0}
+
+    def _delay(self, tokens: float) -> float:
+        delay = self.paused_until - time.monotonic()
+        if self.rpm:
+            delay = max(delay, self.rpm.wait_time(1))
+        if self.tpm:
+            delay = max(delay, self.tpm.wait_time(tokens))
+        return delay
+
+    async def _dispatch(self):
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.done():
+                # The caller was cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            delay = self._delay(tokens)
+            if delay <= 0:
+                heapq.heappop(self._queue)
+                if self.rpm:
+                    self.rpm.consume(1)
+                if self.tpm:
+                    self.tpm.consume(tokens)
+                future.set_result(None)
+                continue
+            # Sleep until the head can go, or until a higher-priority caller arrives
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        self._dispatcher = None
+
+    async def acquire(self, priority: str = "chat", tokens: float = 1) -> float:
+        """Wait for admission; returns the seconds spent queued"""
+        if self.tpm:
+            tokens = min(tokens, self.tpm.capacity)
+        started = time.monotonic()
+        if not self._queue and self._delay(tokens) <= 0:
+            if self.rpm:
+                self.rpm.consume(1)
+            if self.tpm:
+                self.tpm.consume(tokens)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, [PRIORITIES.get(priority, len(PRIORITIES)), next(self._seq), tokens, future])
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            self._changed.set()
+            if self._dispatcher is None:
+                self._dispatcher = asyncio.create_task(self._dispatch())
+            await future
+
+        waited = time.monotonic() - started
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds_total"] += waited
+        if self.observe_wait:
+            self.observe_wait(priority, waited)
+        return waited
+
+    def settle(self, estimated: float, actual: Optional[float]):
+        """Correct the token bucket once the response reports real usage"""
+        if self.tpm and actual is not None:
+            self.tpm.adjust(actual - min(estimated, self.tpm.capacity))
+
+    def refund(self, estimated: float):
+        """Return the tokens reserved for a call that failed without using them"""
+        self.settle(estimated, 0)
+
+    def pause(self, seconds: float):
+        self.stats["rate_limited"] += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        print(f"{self.name} rate limited, pausing dispatch for {seconds:.1f}s")
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {name: 0 for name in PRIORITIES}
+        names = {value: name for name, value in PRIORITIES.items()}
+        for priority, _, _, future in self._queue:
+            if not future.done():
+                depths[names.get(priority, "other")] = depths.get(names.get(priority, "other"), 0) + 1
+        return depths
+
+    def snapshot(self) -> Dict[str, Any]:
+        admitted = self.stats["admitted"]
+        for bucket in (self.rpm, self.tpm):
+            if bucket:
+                bucket.wait_time(0)
+        return {
+            "queue_depth": self.queue_depths(),
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            "requests_available": round(self.rpm.tokens, 1) if self.rpm else None,
+            "tokens_available": round(self.tpm.tokens) if self.tpm else None,
+            "admitted": admitted,
+            "rate_limited": self.stats["rate_limited"],
+            "avg_wait_ms": round(self.stats["wait_seconds_total"] / admitted * 1000, 1) if admitted else 0.0,
+        }
@@ -0,0 +1,249 @@
+"""
+Change the embedding profile of knowledge_base, and measure what a profile costs in recall.
+
+  python reembed.py recall --profiles 1536,512,256 --storage float32,float16,int8
+      Embeds a sample of knowledge_base under each profile and reports recall@k against
+      full-size float32 search, plus memory per vector for every storage type.
+
+  python reembed.py backfill --dimensions 512
+      Re-embeds every row into the staging column embedding_next (see
+      migrations/004_knowledge_base_embedding_next.sql). Resumable: only rows without
+      embedding_next are embedded, so re-run it until it reports nothing left.
+
+  python reembed.py swap-sql --dimensions 512
+      Prints the SQL that moves embedding_next into embedding and rebuilds the HNSW index and
+      match_knowledge for the new size. Run it, then restart the backend with EMBEDDING_DIMENSIONS=512.
+"""
+import argparse
+import json
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+from supabase import create_client
+
+from quantization import STORAGE_DTYPES, bytes_per_vector
+from vector_index import VectorIndex
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_NATIVE_DIMENSIONS = 1536
+EMBEDDING_BATCH_SIZE = 256
+PAGE_SIZE = 500
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+
+def openai_client():
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None)
+
+
+def supabase_client():
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+
+
+def embed(client, texts, dimensions):
+    """Embeddings for texts under one profile, in request-sized batches"""
+    options = {} if dimensions == EMBEDDING_NATIVE_DIMENSIONS else {"dimensions": dimensions}
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts[start:start + EMBEDDING_BATCH_SIZE], **options)
+        vectors += [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def iter_pages(db, columns, only_missing=False):
+    """knowledge_base rows in id order, one page at a time (keyset pagination)"""
+    last_id = None
+    while True:
+        query = db.table("knowledge_base").select(columns).order("id").limit(PAGE_SIZE)
+        if only_missing:
+            query = query.is_("embedding_next", "null")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+# ============= BACKFILL =============
+
+def backfill(dimensions, concurrency=4):
+    client, db = openai_client(), supabase_client()
+    totals = {"embedded": 0, "failed": 0}
+
+    def write(row, vector):
+        db.table("knowledge_base").update({"embedding_next": vector.tolist()}).eq("id", row["id"]).execute()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for rows in iter_pages(db, "id, content", only_missing=True):
+            try:
+                vectors = embed(client, [r["content"] for r in rows], dimensions)
+            except Exception as e:
+                print(f"Embedding error, skipping {len(rows)} rows: {e}")
+                totals["failed"] += len(rows)
+                continue
+            for row, future in [(row, pool.submit(write, row, vector)) for row, vector in zip(rows, vectors)]:
+                try:
+                    future.result()
+                    totals["embedded"] += 1
+                except Exception as e:
+                    print(f"Update error for {row['id']}: {e}")
+                    totals["failed"] += 1
+            print(f"Progress: {totals['embedded']} re-embedded, {totals['failed']} failed")
+
+    print(f"Backfill complete: {totals['embedded']} re-embedded at {dimensions} dimensions, {totals['failed']} failed")
+    if totals["embedded"] or totals["failed"]:
+        print("Run backfill again until nothing is left (rows ingested meanwhile are picked up too)")
+    return totals
+
+
+# ============= SWAP =============
+
+def swap_sql(dimensions):
+    """SQL that promotes embedding_next to embedding at the new size (match_knowledge taken from schema.sql)"""
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        schema = f.read()
+    function = re.search(r"create or replace function match_knowledge .*?\n\$\$;", schema, re.S).group(0)
+    function = function.replace(f"vector({EMBEDDING_NATIVE_DIMENSIONS})", f"vector({dimensions})")
+    return f"""-- Promote embedding_next ({dimensions} dimensions) to embedding.
+-- Check first that backfill left nothing behind (expect 0):
+--   select count(*) from knowledge_base where embedding_next is null;
+-- Searches fail between the swap and a backend restart with EMBEDDING_DIMENSIONS={dimensions}.
+
+begin;
+drop index if exists knowledge_base_embedding_hnsw;
+drop function if exists match_knowledge(vector, int, text, float, int, boolean);
+alter table knowledge_base alter column embedding type vector({dimensions}) using embedding_next::vector({dimensions});
+alter table knowledge_base drop column embedding_next;
+{function}
+commit;
+
+-- Outside the transaction (CREATE INDEX CONCURRENTLY cannot run inside one):
+create index concurrently if not exists knowledge_base_embedding_hnsw
+on knowledge_base using hnsw (embedding vector_cosine_ops)
+with (m = 16, ef_construction = 64);
+
+analyze knowledge_base;
+"""
+
+
+# ============= RECALL REPORT =============
+
+def pseudo_queries(contents, count, rng):
+    """Short word windows cut from random documents, standing in for user queries"""
+    queries = []
+    for content in rng.sample(contents, min(count, len(contents))):
+        words = content.split()
+        length = rng.randint(6, 14)
+        start = rng.randint(0, max(0, len(words) - length))
+        queries.append(" ".join(words[start:start + length]))
+    return [q for q in queries if q]
+
+
+def top_ids(index, queries, k):
+    return [{r["id"] for r in index.search(q, k)} for q in queries]
+
+
+def recall_report(profiles, storages, sample=1000, query_count=100, queries_path=None, k=5, truncate=False, seed=0):
+    client, db = openai_client(), supabase_client()
+    rng = random.Random(seed)
+
+    rows = []
+    for page in iter_pages(db, "id, content"):
+        rows += page
+        if len(rows) >= sample:
+            break
+    rows = rows[:sample]
+    contents = [r["content"] for r in rows]
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = pseudo_queries(contents, query_count, rng)
+    print(f"Corpus: {len(rows)} documents, {len(queries)} queries, k={k}")
+
+    profiles = sorted(set(profiles), reverse=True)
+    vectors = {}
+    for dimensions in profiles:
+        if truncate and dimensions != profiles[0]:
+            # What the dimensions parameter does for text-embedding-3: keep the leading components
+            # (the index renormalizes them)
+            full_docs, full_queries = vectors[profiles[0]]
+            vectors[dimensions] = (full_docs[:, :dimensions], full_queries[:, :dimensions])
+        else:
+            vectors[dimensions] = (embed(client, contents, dimensions), embed(client, queries, dimensions))
+
+    def build(dimensions, storage, rescore):
+        index = VectorIndex(dim=dimensions, initial_capacity=max(len(rows), 1), storage=storage, rescore=rescore)
+        index.add([{"id": r["id"], "content": None, "source": None, "embedding": v}
+                    for r, v in zip(rows, vectors[dimensions][0])])
+        return index
+
+    baseline = top_ids(build(profiles[0], "float32", False), vectors[profiles[0]][1], k)
+    report = []
+    for dimensions in profiles:
+        for storage in storages:
+            for rescore in ([False] if storage == "float32" else [True, False]):
+                found = top_ids(build(dimensions, storage, rescore), vectors[dimensions][1], k)
+                recall = float(np.mean([len(a & b) / k for a, b in zip(found, baseline)])) if baseline else 0.0
+                report.append({
+                    "dimensions": dimensions,
+                    "storage": storage,
+                    "rescore": rescore,
+                    f"recall_at_{k}": round(recall, 4),
+                    "bytes_per_vector": bytes_per_vector(dimensions, storage),
+                    "memory_vs_baseline": round(bytes_per_vector(profiles[0], "float32") / bytes_per_vector(dimensions, storage), 1),
+                })
+
+    print(f"{'dims':>6} {'storage':>8} {'rescore':>8} {'recall@' + str(k):>10} {'bytes':>7} {'smaller':>8}")
+    for entry in report:
+        print(f"{entry['dimensions']:>6} {entry['storage']:>8} {str(entry['rescore']):>8} "
+              f"{entry[f'recall_at_{k}']:>10.4f} {entry['bytes_per_vector']:>7} {entry['memory_vs_baseline']:>7}x")
+    return {"documents": len(rows), "queries": len(queries), "k": k, "baseline_dimensions": profiles[0], "results": report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed knowledge_base under a new embedding profile")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    recall = commands.add_parser("recall", help="recall@k of embedding profiles and storage types")
+    recall.add_argument("--profiles", default="1536,512,256", help="comma-separated dimensions; the largest is the baseline")
+    recall.add_argument("--storage", default=",".join(STORAGE_DTYPES), help="comma-separated storage types")
+    recall.add_argument("--sample", type=int, default=1000, help="knowledge_base rows to embed per profile")
+    recall.add_argument("--queries", help="file with one query per line (default: word windows from sampled documents)")
+    recall.add_argument("--query-count", type=int, default=100)
+    recall.add_argument("-k", type=int, default=5)
+    recall.add_argument("--truncate", action="store_true", help="derive smaller profiles from the baseline vectors instead of calling the API")
+    recall.add_argument("--output", help="also write the report as JSON")
+
+    for name, help_text in (("backfill", "re-embed rows into embedding_next"), ("swap-sql", "print the SQL that switches to embedding_next")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--dimensions", type=int, required=True)
+        if name == "backfill":
+            command.add_argument("--concurrency", type=int, default=4)
+
+    args = parser.parse_args()
+    if args.command == "recall":
+        result = recall_report(
+            [int(d) for d in args.profiles.split(",")],
+            [s.strip() for s in args.storage.split(",")],
+            sample=args.sample,
+            query_count=args.query_count,
+            queries_path=args.queries,
+            k=args.k,
+            truncate=args.truncate
+        )
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+    elif args.command == "backfill":
+        backfill(args.dimensions, concurrency=args.concurrency)
+    else:
+        print(swap_sql(args.dimensions))
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from chunking import estimate_tokens
+from vector_index import parse_embedding
+
+
+def diversify(rows: List[Dict[str, Any]], k: int, relevance: Optional[List[float]] = None,
+              mmr_lambda: float = 0.7, duplicate_threshold: float = 0.95,
+              token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Pick up to k of the candidate rows (best first, each carrying an "embedding") by maximal
+    marginal relevance: every pick maximizes
+        mmr_lambda * relevance - (1 - mmr_lambda) * max cosine similarity to the rows already picked.
+    Candidates at or above duplicate_threshold similarity to a pick are dropped, and rows that
+    would overflow token_budget are skipped (the first pick is always kept).
+    relevance defaults to each row's "similarity". Returned rows no longer carry embeddings.
+    """
+    if not rows:
+        return []
+    matrix = np.asarray([parse_embedding(r["embedding"]) for r in rows], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    pairwise = matrix @ matrix.T
+
+    if relevance is None:
+        relevance = [r.get("similarity") or 0.0 for r in rows]
+    relevance = np.asarray(relevance, dtype=np.float32)
+    # Relevance and similarity should be on comparable scales for the trade-off to mean anything
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+    tokens = np.asarray([estimate_tokens(r.get("content") or "") for r in rows])
+    available = np.ones(len(rows), dtype=bool)
+    redundancy = np.zeros(len(rows), dtype=np.float32)
+    picked: List[int] = []
+    used_tokens = 0
+
+    while len(picked) < k and available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        if picked and token_budget is not None and used_tokens + tokens[best] > token_budget:
+            continue
+        picked.append(best)
+        used_tokens += int(tokens[best])
+        redundancy = np.maximum(redundancy, pairwise[best])
+        available &= pairwise[best] < duplicate_threshold
+
+    return [{key: value for key, value in rows[i].items() if key != "embedding"} for i in picked]
+
+
+def pack_to_budget(rows: List[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+    """Keep rows in order while they fit in token_budget (the first row is always kept)"""
+    packed, used = [], 0
+    for row in rows:
+        cost = estimate_tokens(row.get("content") or "")
+        if packed and used + cost > token_budget:
+            continue
+        packed.append(row)
+        used += cost
+    return packed
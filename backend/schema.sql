@@ -51,11 +51,25 @@ create table if not exists user_progress (
 create table if not exists knowledge_base (
   id uuid default gen_random_uuid() primary key,
   content text not null,
-  embedding vector(1536), -- 1536 is dimensions for text-embedding-3-small
+  embedding vector(1536), -- 1536 is dimensions for text-embedding-3-small; must match EMBEDDING_DIMENSIONS (change it with reembed.py)
   source text,
+  -- Chunked ingestion: the source document a chunk belongs to and the hash of its normalized text
+  document_id text,
+  content_hash text,
   created_at timestamp with time zone default timezone('utc'::text, now())
 );
 
+-- Approximate nearest-neighbour index so match_knowledge stays flat as the table grows
+-- (m / ef_construction trade build time and memory for recall)
+create index if not exists knowledge_base_embedding_hnsw
+on knowledge_base using hnsw (embedding vector_cosine_ops)
+with (m = 16, ef_construction = 64);
+
+create index if not exists knowledge_base_source_idx on knowledge_base (source);
+
+-- Re-ingestion looks up the stored chunk hashes of each document
+create index if not exists knowledge_base_document_idx on knowledge_base (document_id, content_hash);
+
 -- Enable RLS on all tables
 alter table profiles enable row level security;
 alter table user_skills enable row level security;
@@ -94,26 +108,55 @@ using (auth.uid() = user_id);
 create policy "Public Access" on knowledge_base for select using (true);
 
 -- Create match_knowledge function for vector similarity search
+-- filter_source restricts results to one source; min_similarity drops weak matches;
+-- ef_search is the HNSW candidate list size (higher = better recall, slower);
+-- include_embedding also returns each row's vector (for diversity re-ranking of the candidates)
 create or replace function match_knowledge (
   query_embedding vector(1536),
-  match_count int DEFAULT 5
+  match_count int DEFAULT 5,
+  filter_source text DEFAULT null,
+  min_similarity float DEFAULT null,
+  ef_search int DEFAULT 40,
+  include_embedding boolean DEFAULT false
 ) returns table (
   id uuid,
   content text,
   source text,
-  similarity float
+  similarity float,
+  embedding vector(1536)
 )
 language plpgsql
 as $$
 begin
+  perform set_config('hnsw.ef_search', greatest(ef_search, match_count)::text, true);
+  -- pgvector >= 0.8: keep walking the graph until enough rows pass the source filter
+  begin
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  exception when others then
+    null;
+  end;
+
   return query
+  with candidates as materialized (
+    select
+      kb.id,
+      kb.content,
+      kb.source,
+      kb.embedding,
+      kb.embedding <=> query_embedding as distance
+    from knowledge_base kb
+    where filter_source is null or kb.source = filter_source
+    order by kb.embedding <=> query_embedding
+    limit match_count
+  )
   select
-    kb.id,
-    kb.content,
-    kb.source,
-    1 - (kb.embedding <=> query_embedding) as similarity
-  from knowledge_base kb
-  order by kb.embedding <=> query_embedding
-  limit match_count;
+    c.id,
+    c.content,
+    c.source,
+    1 - c.distance as similarity,
+    case when include_embedding then c.embedding end
+  from candidates c
+  where min_similarity is null or 1 - c.distance >= min_similarity
+  order by c.distance;
 end;
 $$;
@@ -0,0 +1,102 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from vector_index import VectorIndex
+
+# Upper edges of the best-similarity histogram used to tune the thresholds
+SIMILARITY_BUCKETS = [0.80, 0.85, 0.90, 0.93, 0.95, 0.97, 0.99, 1.01]
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query meaning rather than exact text.
+    Queries are matched by cosine similarity of their embeddings; entries expire
+    after a TTL and the oldest are evicted once the cache is full.
+    """
+
+    def __init__(self, dim: int = 1536, threshold: float = 0.95, near_miss_threshold: float = 0.90,
+                 ttl: float = 86400, max_entries: int = 5000):
+        self.threshold = threshold
+        self.near_miss_threshold = near_miss_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._index = VectorIndex(dim=dim, initial_capacity=min(max_entries, 1024))
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "near_misses": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "purges": 0}
+        self.similarity_histogram = [0] * len(SIMILARITY_BUCKETS)
+
+    def _record_similarity(self, similarity: float):
+        for i, edge in enumerate(SIMILARITY_BUCKETS):
+            if similarity < edge:
+                self.similarity_histogram[i] += 1
+                return
+
+    def lookup(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached entry ({query, answer, similarity}) for the closest live query, if close enough"""
+        with self._lock:
+            now = time.monotonic()
+            for match in self._index.search(embedding, k=4):
+                entry = self._entries.get(match["id"])
+                if entry is None:
+                    continue
+                if now - entry["created_at"] >= self.ttl:
+                    self._drop(match["id"])
+                    self.stats["expirations"] += 1
+                    continue
+
+                similarity = match["similarity"]
+                self._record_similarity(similarity)
+                if similarity >= self.threshold:
+                    self.stats["hits"] += 1
+                    self._entries.move_to_end(match["id"])
+                    return {"query": entry["query"], "answer": entry["answer"], "similarity": similarity}
+                if similarity >= self.near_miss_threshold:
+                    self.stats["near_misses"] += 1
+                else:
+                    self.stats["misses"] += 1
+                return None
+
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, query: str, embedding: List[float], answer: str):
+        with self._lock:
+            entry_id = str(next(self._ids))
+            self._index.add([{"id": entry_id, "embedding": embedding}])
+            self._entries[entry_id] = {"query": query, "answer": answer, "created_at": time.monotonic()}
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    def _drop(self, entry_id: str):
+        self._entries.pop(entry_id, None)
+        self._index.remove([entry_id])
+
+    def purge(self):
+        """Forget every answer, e.g. after the knowledge base changes"""
+        with self._lock:
+            self._index.remove(list(self._entries))
+            self._entries.clear()
+            self.stats["purges"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["near_misses"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "threshold": self.threshold,
+                "near_miss_threshold": self.near_miss_threshold,
+                "similarity_histogram": {
+                    f"<{edge:.2f}": count for edge, count in zip(SIMILARITY_BUCKETS, self.similarity_histogram)
+                },
+            }
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls: the first caller for a key (the leader) runs the call,
+    callers arriving while it is in flight (followers) await the same result or exception.
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name: str, track: Optional[Callable[[str], None]] = None):
+        self.name = name
+        # Called with "leader" or "follower" for every call (metrics hook)
+        self.track = track
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so a call whose callers all went away is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            role = "leader"
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            role = "follower"
+        self.stats[f"{role}s"] += 1
+        if self.track:
+            self.track(role)
+        # One caller timing out or being cancelled must not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = self.stats["leaders"] + self.stats["followers"]
+        return {
+            **self.stats,
+            "in_flight": len(self._calls),
+            "coalescing_ratio": round(self.stats["followers"] / calls, 4) if calls else 0.0,
+        }
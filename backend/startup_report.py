@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+# "import time:       639 |     493832 |   openai"
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str = "main", top: int = 15) -> Dict:
+    """Import `module` in a fresh interpreter under -X importtime and summarize where the time goes"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+
+    root = next((e for e in entries if e["module"] == module and e["depth"] == 0), None)
+    direct = sorted((e for e in entries if e["depth"] == 1), key=lambda e: -e["cumulative_ms"])
+    slowest = sorted(entries, key=lambda e: -e["self_ms"])
+
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "interpreter_wall_ms": round(wall_ms, 1),
+        "import_ms": root["cumulative_ms"] if root else None,
+        "modules_imported": len(entries),
+        "direct_imports": [{k: e[k] for k in ("module", "cumulative_ms")} for e in direct[:top]],
+        "slowest_self": [{k: e[k] for k in ("module", "self_ms")} for e in slowest[:top]],
+    }
+
+
+def client_profile(factories: Dict[str, Callable]) -> Dict[str, Optional[float]]:
+    """Time each lazy client factory on first use (includes its deferred SDK import)"""
+    timings = {}
+    for name, factory in factories.items():
+        started = time.perf_counter()
+        try:
+            client = factory()
+        except Exception as e:
+            timings[name] = f"error: {e}"
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1) if client is not None else None
+    return timings
+
+
+def build_report(module: str = "main", factories: Optional[Dict[str, Callable]] = None, top: int = 15) -> Dict:
+    return {
+        "python": sys.version.split()[0],
+        "module": module,
+        "imports": import_profile(module, top),
+        "first_use_ms": client_profile(factories or {}),
+    }
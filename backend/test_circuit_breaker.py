@@ -0,0 +1,33 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker, default_is_failure
+
+
+def api_error(code):
+    return APIError({"message": "error", "code": code, "hint": None, "details": None})
+
+
+@pytest.mark.parametrize("code", ["PGRST116", "PGRST204", "PGRST301", "23505", "22P02", "42P01", "42501"])
+def test_postgrest_client_errors_are_not_failures(code):
+    assert not default_is_failure(api_error(code))
+
+
+@pytest.mark.parametrize("code", ["PGRST000", "PGRST003", "57014", "53300", "08006", None])
+def test_postgrest_server_errors_are_failures(code):
+    assert default_is_failure(api_error(code))
+
+
+def test_client_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker("supabase", failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(APIError):
+            with breaker.guard():
+                raise api_error("PGRST116")
+    assert breaker.state == CLOSED
+
+    for _ in range(2):
+        with pytest.raises(APIError):
+            with breaker.guard():
+                raise api_error("PGRST000")
+    assert breaker.state == OPEN
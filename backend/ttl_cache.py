@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Size-bounded async cache with a freshness TTL and a stale-while-revalidate window.
+
+    - age < ttl:                 served as a fresh hit
+    - ttl <= age < ttl + stale:  served immediately, refreshed in the background
+    - otherwise:                 loaded inline (a miss)
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 256,
+                 should_cache: Optional[Callable[[Any], bool]] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.should_cache = should_cache or (lambda value: True)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def _store(self, key: Hashable, value: Any):
+        if not self.should_cache(value):
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: Hashable, value: Any):
+        self._store(key, value)
+
+    def peek(self, key: Hashable) -> Tuple[str, Any]:
+        """Return ("fresh" | "stale" | "miss", value) without loading"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return "miss", None
+        age = time.monotonic() - entry[0]
+        if age < self.ttl:
+            return "fresh", entry[1]
+        if age < self.ttl + self.stale_ttl:
+            return "stale", entry[1]
+        del self._entries[key]
+        return "miss", None
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            self._store(key, await loader())
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            # Keep serving the stale value until it ages out
+            self.stats["refresh_errors"] += 1
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Return (value, state) where state is "fresh", "stale" or "miss\""""
+        state, value = self.peek(key)
+        if state == "fresh":
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value, state
+        if state == "stale":
+            self.stats["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+            return value, state
+
+        self.stats["misses"] += 1
+        value = await loader()
+        self._store(key, value)
+        return value, state
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        served = self.stats["hits"] + self.stats["stale_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "capacity": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_ttl,
+        }
@@ -0,0 +1,72 @@
+import asyncio
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamHTTP:
+    """
+    Shared, pooled HTTP client for third-party fetchers (GNews, RSS, ...).
+    Created in the FastAPI lifespan; keep-alive connections are reused across requests
+    and each host is capped at max_per_host concurrent requests.
+    """
+
+    def __init__(self, track: Optional[Callable] = None, connect_timeout: float = 5, read_timeout: float = 15,
+                 max_connections: int = 100, max_per_host: int = 20, keepalive_expiry: float = 30, http2: bool = True):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_per_host = max_per_host
+        # Context-manager factory called with the upstream label around every request (metrics hook)
+        self.track = track
+        self.http2 = http2 and http2_available()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Built lazily so code paths that run outside the lifespan still get a pooled client
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": "EduAI-Backend/1.0"}
+            )
+        return self._client
+
+    async def start(self):
+        return self.client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def request(self, method: str, url: str, upstream: str = "http", **kwargs) -> httpx.Response:
+        async with self._host_limit(url):
+            with self.track(upstream) if self.track else nullcontext():
+                return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, upstream: str = "http", **kwargs) -> httpx.Response:
+        return await self.request("GET", url, upstream=upstream, **kwargs)
@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from quantization import STORAGE_DTYPES, bytes_per_vector, check_storage, dequantize, quantize
+
+# Rows converted to float32 at a time when scoring compact storage. Blocks stay in CPU cache,
+# so int8 scans at about float32 speed for a quarter of the memory (float16 is several times
+# slower: numpy has no fast half-precision conversion)
+SCORE_BLOCK_ROWS = 256
+
+
+def parse_embedding(value) -> List[float]:
+    """PostgREST returns pgvector columns as '[0.1,0.2,...]' strings"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+class VectorIndex:
+    """
+    In-process mirror of knowledge_base embeddings.
+    Rows live in one contiguous matrix, L2-normalized so a single
+    matrix-vector product yields cosine similarity for every row.
+
+    storage="float16" or "int8" keeps that matrix 2x / 4x smaller. Compact scores are
+    approximate, so the top k * rescore_multiplier candidates are re-scored against float32
+    copies kept in an unlinked, disk-backed file (rescore=False skips that and keeps only
+    the compact matrix).
+    """
+
+    def __init__(self, dim: int = 1536, initial_capacity: int = 1024, storage: str = "float32",
+                 rescore: bool = True, rescore_multiplier: int = 4, rescore_dir: Optional[str] = None):
+        self.dim = dim
+        self.storage = check_storage(storage)
+        self.rescore_multiplier = rescore_multiplier
+        self.rescore_dir = rescore_dir
+        self._matrix = np.zeros((initial_capacity, dim), dtype=STORAGE_DTYPES[storage])
+        self._scales = np.ones(initial_capacity, dtype=np.float32) if storage == "int8" else None
+        self._full = self._disk_matrix(initial_capacity) if storage != "float32" and rescore else None
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def __len__(self):
+        return self._size
+
+    def _disk_matrix(self, capacity: int) -> np.ndarray:
+        """float32 matrix backed by a temporary file; pages are read back only for rescoring"""
+        fd, path = tempfile.mkstemp(prefix="vector_index_", suffix=".f32", dir=self.rescore_dir)
+        os.close(fd)
+        matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        try:
+            # The mapping keeps the data alive; nothing is left on disk after exit
+            os.unlink(path)
+        except OSError:
+            pass
+        return matrix
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=self._matrix.dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+        if self._full is not None:
+            full = self._disk_matrix(capacity)
+            full[:self._size] = self._full[:self._size]
+            self._full = full
+
+    def _vector(self, pos: int) -> np.ndarray:
+        """float32 vector at a position (exact copy if kept, else decoded)"""
+        if self._full is not None:
+            return np.array(self._full[pos])
+        return dequantize(self._matrix[pos:pos + 1], None if self._scales is None else self._scales[pos:pos + 1])[0]
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        if self.storage == "float32":
+            return self._matrix[:self._size] @ query
+        scores = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self._size)
+            scores[start:end] = self._matrix[start:end].astype(np.float32) @ query
+        if self._scales is not None:
+            scores *= self._scales[:self._size]
+        return scores
+
+    def add(self, rows: List[Dict[str, Any]]):
+        """Insert or replace rows shaped like knowledge_base records ({id, content, source, embedding})"""
+        rows = [r for r in rows if r.get("embedding") is not None]
+        if not rows:
+            return
+        vectors = np.asarray([parse_embedding(r["embedding"]) for r in rows], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dimension {self.dim}")
+        vectors = self._normalize(vectors)
+        codes, scales = quantize(vectors, self.storage)
+
+        with self._lock:
+            self.remove([str(r["id"]) for r in rows])
+            self._reserve(len(rows))
+            start = self._size
+            end = start + len(rows)
+            self._matrix[start:end] = codes
+            if self._scales is not None:
+                self._scales[start:end] = scales
+            if self._full is not None:
+                self._full[start:end] = vectors
+            for offset, r in enumerate(rows):
+                doc_id = str(r["id"])
+                self._positions[doc_id] = start + offset
+                self._ids.append(doc_id)
+                self._rows.append({"id": doc_id, "content": r.get("content"), "source": r.get("source")})
+            self._size += len(rows)
+
+    def remove(self, ids: List[str]):
+        """Delete rows by id, back-filling each hole with the last row to keep the matrix dense"""
+        with self._lock:
+            for doc_id in ids:
+                pos = self._positions.pop(str(doc_id), None)
+                if pos is None:
+                    continue
+                last = self._size - 1
+                if pos != last:
+                    self._matrix[pos] = self._matrix[last]
+                    if self._scales is not None:
+                        self._scales[pos] = self._scales[last]
+                    if self._full is not None:
+                        self._full[pos] = self._full[last]
+                    self._ids[pos] = self._ids[last]
+                    self._rows[pos] = self._rows[last]
+                    self._positions[self._ids[pos]] = pos
+                self._ids.pop()
+                self._rows.pop()
+                self._size -= 1
+
+    def search(self, query_embedding: List[float], k: int = 5, source: Optional[str] = None,
+               min_similarity: Optional[float] = None, with_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """
+        Top-k rows by cosine similarity, best first, shaped like match_knowledge results.
+        with_embeddings adds each row's (normalized) vector as "embedding".
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if self._size == 0:
+                return []
+            scores = self._scores(query)
+            if source is not None:
+                mask = np.fromiter((r["source"] == source for r in self._rows), dtype=bool, count=self._size)
+                scores = np.where(mask, scores, -np.inf)
+            candidates = min(k * self.rescore_multiplier if self._full is not None else k, self._size)
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            top = top[scores[top] > -np.inf]
+            if self._full is not None and len(top):
+                # Exact float32 scores for the shortlist (reads only these rows from disk)
+                order = np.sort(top)
+                scores = np.full(self._size, -np.inf, dtype=np.float32)
+                scores[order] = np.asarray(self._full[order]) @ query
+            top = top[np.argsort(-scores[top])][:k]
+            floor = -np.inf if min_similarity is None else min_similarity
+            results = []
+            for i in top:
+                if scores[i] >= floor:
+                    row = {**self._rows[i], "similarity": float(scores[i])}
+                    if with_embeddings:
+                        row["embedding"] = self._vector(i)
+                    results.append(row)
+            return results
+
+    def embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored (normalized) vectors for the given ids that are in the index"""
+        with self._lock:
+            return {str(doc_id): self._vector(self._positions[str(doc_id)])
+                    for doc_id in ids if str(doc_id) in self._positions}
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            memory = self._matrix.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+            return {
+                "ready": self.ready,
+                "rows": self._size,
+                "capacity": self._matrix.shape[0],
+                "dimensions": self.dim,
+                "storage": self.storage,
+                "bytes_per_vector": bytes_per_vector(self.dim, self.storage),
+                "memory_mb": round(memory / (1024 * 1024), 2),
+                "rescore_file_mb": round(self._full.nbytes / (1024 * 1024), 2) if self._full is not None else None,
+            }